@@ -0,0 +1,104 @@
+"""
+Microbenchmark de l'index des absences (IntervalTree) à 10k absences.
+
+    python bench/absence_index.py --absences 10000
+
+Compare les requêtes de l'AbsenceIndex (« qui est absent le jour D », « absences
+entre a et b », « X est-il absent ») à un parcours linéaire de la même liste,
+ce que ferait un cache naïf. Aucun accès à la BDD.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.intervals import AbsenceIndex
+
+
+STAFF = 200
+QUERIES = 2000
+
+
+def make_absences(count: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    today = datetime.date(2025, 1, 1)
+    rows = []
+    for absence_id in range(1, count + 1):
+        start = today + datetime.timedelta(days=rng.randrange(3 * 365))
+        rows.append({
+            "id": absence_id,
+            "staff_id": rng.randrange(STAFF),
+            "start_date": start,
+            "end_date": start + datetime.timedelta(days=rng.randint(0, 14)),
+            "reason": "bench",
+        })
+    return rows
+
+
+def per_call(func, args_list) -> tuple[float, int]:
+    """(µs par appel, nombre total de résultats)."""
+    found = 0
+    began = time.perf_counter()
+    for args in args_list:
+        result = func(*args)
+        found += len(result) if isinstance(result, list) else int(result)
+    return (time.perf_counter() - began) / len(args_list) * 1e6, found
+
+
+def main(args):
+    rows = make_absences(args.absences)
+    rng = random.Random(2)
+    first = min(r["start_date"] for r in rows)
+    span = (max(r["end_date"] for r in rows) - first).days
+
+    began = time.perf_counter()
+    index = AbsenceIndex()
+    for row in rows:
+        index.add(row)
+    build = time.perf_counter() - began
+
+    days = [(first + datetime.timedelta(days=rng.randrange(span)),) for _ in range(QUERIES)]
+    windows = [(d, d + datetime.timedelta(days=7)) for (d,) in days]
+    staff_days = [(rng.randrange(STAFF), d) for (d,) in days]
+
+    def scan_at(day):
+        return [r for r in rows if r["start_date"] <= day <= r["end_date"]]
+
+    def scan_between(start, end):
+        return [r for r in rows if r["start_date"] <= end and r["end_date"] >= start]
+
+    def scan_is_absent(staff_id, day):
+        return any(r["staff_id"] == staff_id and r["start_date"] <= day <= r["end_date"] for r in rows)
+
+    cases = [
+        ("absent_on(jour)", index.absent_on, scan_at, days),
+        ("between(a, a+7j)", index.between, scan_between, windows),
+        ("is_absent(staff, jour)", index.is_absent, scan_is_absent, staff_days),
+    ]
+
+    print(f"{args.absences} absences, {STAFF} staffs, {QUERIES} requêtes par cas")
+    print(f"Construction de l'index : {build * 1000:.1f} ms ({build / args.absences * 1e6:.1f} µs/absence)\n")
+    print(f"{'requête':<24} {'arbre (µs)':>11} {'linéaire (µs)':>14} {'gain':>7}")
+    for label, tree_func, scan_func, args_list in cases:
+        tree_cost, tree_found = per_call(tree_func, args_list)
+        scan_cost, scan_found = per_call(scan_func, args_list)
+        assert tree_found == scan_found, f"{label} : résultats différents ({tree_found} != {scan_found})"
+        print(f"{label:<24} {tree_cost:>11.1f} {scan_cost:>14.1f} {scan_cost / tree_cost:>6.0f}x")
+
+    # Écriture : suppression puis réinsertion (annulation / nouvelle déclaration)
+    sample = rng.sample(rows, min(QUERIES, len(rows)))
+    began = time.perf_counter()
+    for row in sample:
+        index.remove(row["id"])
+        index.add(row)
+    print(f"\nremove + add : {(time.perf_counter() - began) / len(sample) * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--absences", type=int, default=10_000)
+    main(parser.parse_args())
@@ -0,0 +1,168 @@
+"""
+Démarrage d'un serveur synthétique de 50k membres : réglages par défaut vs LEAN_MEMORY_MODE.
+
+    python bench/lean_memory.py --members 50000 --messages 5000
+
+Rejoue dans le ConnectionState de discord.py les payloads gateway qu'enverrait
+Discord au démarrage : GUILD_CREATE (membres en ligne seulement, comme pour un
+gros serveur), puis GUILD_MEMBERS_CHUNK par lots de 1000 si le bot charge les
+membres, puis des MESSAGE_CREATE. En mode léger, seuls quelques membres sont
+demandés ensuite (noms des panneaux, super admins), comme le ferait le bot.
+
+Chaque mode tourne dans son propre processus pour que ru_maxrss (pic de mémoire
+résidente) ne mesure que lui. Aucune connexion à Discord.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import datetime
+import subprocess
+
+import discord
+from discord.state import ChunkRequest
+
+
+GUILD_ID = 1443995814765793405
+CHANNEL_ID = 1450667899785314425
+STAFF_ROLE = 1450670481144549446
+SELF_ID = 1000
+CHUNK_SIZE = 1000
+ONLINE_MEMBERS = 150  # membres inclus dans GUILD_CREATE pour un serveur "large"
+LEAN_FETCHED = 60     # membres demandés à la demande en mode léger (noms des panneaux, super admins)
+
+MODES = {
+    "défaut": {},
+    "léger": {
+        "chunk_guilds_at_startup": False,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "max_messages": None,
+    },
+}
+
+
+def rss_mb() -> float:
+    """Mémoire résidente actuelle (Linux), sinon le pic."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_mb()
+
+
+def peak_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def member_payload(user_id: int) -> dict:
+    return {
+        "user": {"id": str(user_id), "username": f"membre{user_id}", "discriminator": "0", "global_name": f"Membre {user_id}", "avatar": None},
+        "roles": [str(STAFF_ROLE)] if user_id % 500 == 0 else [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "nick": None, "avatar": None, "premium_since": None, "pending": False,
+        "deaf": False, "mute": False, "flags": 0, "communication_disabled_until": None,
+    }
+
+
+def guild_create_payload(members: int) -> dict:
+    role = {"permissions": "0", "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False}
+    return {
+        "id": str(GUILD_ID), "name": "Bench", "owner_id": str(SELF_ID + 1), "member_count": members, "large": True,
+        "roles": [{**role, "id": str(GUILD_ID), "name": "@everyone"}, {**role, "id": str(STAFF_ROLE), "name": "Support", "position": 1}],
+        "channels": [{"id": str(CHANNEL_ID), "type": 0, "name": "general", "position": 0, "permission_overwrites": []}],
+        "members": [member_payload(SELF_ID)] + [member_payload(SELF_ID + 1 + i) for i in range(ONLINE_MEMBERS)],
+        "emojis": [], "stickers": [], "features": [], "threads": [], "voice_states": [], "presences": [],
+        "stage_instances": [], "guild_scheduled_events": [], "soundboard_sounds": [],
+    }
+
+
+def message_payload(message_id: int, author_id: int) -> dict:
+    member = member_payload(author_id)
+    return {
+        "id": str(message_id), "channel_id": str(CHANNEL_ID), "guild_id": str(GUILD_ID),
+        "author": member["user"], "member": {k: v for k, v in member.items() if k != "user"},
+        "content": "bonjour, une question sur le règlement du serveur " * 3, "timestamp": "2025-01-01T18:00:00+00:00",
+        "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+        "attachments": [], "embeds": [], "pinned": False, "type": 0, "flags": 0,
+    }
+
+
+def replay_chunks(state, guild, user_ids: list[int], cache: bool):
+    """GUILD_MEMBERS_CHUNK pour user_ids, via une requête de chunk comme guild.chunk()/query_members()."""
+    request = ChunkRequest(guild.id, guild.shard_id, asyncio.get_running_loop(), state._get_guild, cache=cache)
+    state._chunk_requests[request.nonce] = request
+    count = (len(user_ids) + CHUNK_SIZE - 1) // CHUNK_SIZE
+    for index in range(count):
+        batch = user_ids[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+        # Sérialisé puis relu, comme une trame gateway
+        data = json.loads(json.dumps({
+            "guild_id": str(guild.id), "members": [member_payload(uid) for uid in batch],
+            "chunk_index": index, "chunk_count": count, "nonce": request.nonce,
+        }))
+        state.parse_guild_members_chunk(data)
+
+
+async def run_mode(mode: str, members: int, messages: int) -> dict:
+    client = discord.Client(intents=discord.Intents(guilds=True, members=True, guild_messages=True, message_content=True), **MODES[mode])
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=member_payload(SELF_ID)["user"])
+    before = rss_mb()
+    started = time.perf_counter()
+
+    state.parse_guild_create(json.loads(json.dumps(guild_create_payload(members))))
+    guild = client.get_guild(GUILD_ID)
+    # Le chunk automatique a besoin d'une gateway : on rejoue ses réponses directement
+    for task in [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]:
+        task.cancel()
+
+    all_ids = [SELF_ID + 1 + i for i in range(members - 1)]
+    if state._chunk_guilds:
+        replay_chunks(state, guild, all_ids, cache=state.member_cache_flags.joined)
+    else:
+        # Mode léger : seuls les membres affichés ou notifiés sont demandés (query_members(cache=True))
+        step = max(1, len(all_ids) // LEAN_FETCHED)
+        replay_chunks(state, guild, all_ids[::step][:LEAN_FETCHED], cache=True)
+
+    for i in range(messages):
+        state.parse_message_create(json.loads(json.dumps(message_payload(10 ** 9 + i, all_ids[i % len(all_ids)]))))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "members": len(guild.members),
+        "messages": len(state._messages) if state._messages is not None else 0,
+        "elapsed": elapsed,
+        "rss_delta": rss_mb() - before,
+        "peak": peak_mb(),
+    }
+
+
+def main(args):
+    if args.mode:
+        print(json.dumps(asyncio.run(run_mode(args.mode, args.members, args.messages))))
+        return
+
+    print(f"Serveur synthétique : {args.members} membres, {args.messages} messages, discord.py {discord.__version__}\n")
+    print(f"{'mode':<8} {'membres en cache':>17} {'messages en cache':>18} {'temps (s)':>10} {'RSS +Mo':>8} {'pic RSS (Mo)':>13}")
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--members", str(args.members), "--messages", str(args.messages)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['mode']:<8} {r['members']:>17} {r['messages']:>18} {r['elapsed']:>10.2f} {r['rss_delta']:>8.0f} {r['peak']:>13.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=50_000)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--mode", choices=list(MODES), help=argparse.SUPPRESS)
+    main(parser.parse_args())
@@ -0,0 +1,112 @@
+"""
+Coût de rendu d'un transcript par message : texte brut vs HTML (dans la boucle
+ou dans le pool de processus), et blocage de la boucle asyncio pendant le rendu.
+
+    python bench/render_transcript.py --messages 5000 --workers 2
+
+Les messages sont synthétiques (embeds façon formulaire de ticket, pièces
+jointes, réponses, messages staff), aucun accès à Discord ni à la BDD.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cogs.tickets import generate_transcript
+
+
+WORDS = "bonjour merci ticket projet reprise joueur staff serveur règlement entretien question réponse".split()
+
+
+def make_records(count: int, seed: int = 1) -> list[dict]:
+    rng = random.Random(seed)
+    start = datetime.datetime(2025, 1, 1, 18, 0, tzinfo=datetime.timezone.utc)
+    records = []
+    for i in range(count):
+        embeds = []
+        if i == 0 or rng.random() < 0.05:
+            embeds.append({
+                "title": "Nouveau ticket",
+                "description": " ".join(rng.choices(WORDS, k=30)),
+                "fields": [{"name": f"Question {n}", "value": " ".join(rng.choices(WORDS, k=20))} for n in range(4)],
+                "footer": {"text": "Remember RolePlay"},
+                "color": 0x8B0000,
+            })
+        attachments = [f"https://cdn.discordapp.com/attachments/1/{i}/capture{n}.png" for n in range(rng.choice((0, 0, 0, 1, 2)))]
+        records.append({
+            "message_id": 10_000 + i,
+            "ticket_id": 1,
+            "author_id": rng.randint(1, 20),
+            "author_name": f"membre{rng.randint(1, 20)}",
+            "content": " ".join(rng.choices(WORDS, k=rng.randint(3, 60))),
+            "original_content": None,
+            "attachments": attachments,
+            "attachment_hashes": [f"{rng.getrandbits(256):064x}" for _ in attachments],
+            "embeds": embeds,
+            "reply_to": 10_000 + rng.randrange(i) if i and rng.random() < 0.2 else None,
+            "is_staff": rng.random() < 0.3,
+            "created_at": start + datetime.timedelta(seconds=30 * i),
+            "edited_at": None,
+            "deleted": rng.random() < 0.02,
+        })
+    return records
+
+
+async def iterate(records):
+    for record in records:
+        yield record
+
+
+async def measure(records, fmt: str, render_pool) -> tuple[float, float, int]:
+    """(durée totale, pire blocage de la boucle, taille) pour un rendu."""
+    stall = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal stall
+        while running:
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - before - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)  # le ticker doit être en attente avant le rendu
+    start = time.perf_counter()
+    f = await generate_transcript("ticket-bench", iterate(records), fmt=fmt, compress=False, render_pool=render_pool)
+    elapsed = time.perf_counter() - start
+    running = False
+    await tick
+    return elapsed, stall, len(f.read())
+
+
+async def main(args):
+    records = make_records(args.messages)
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        # Démarrage des processus hors mesure
+        await measure(records[:10], "html", pool)
+
+        cases = [("texte", "txt", None), ("html (boucle)", "html", None), (f"html (pool x{args.workers})", "html", pool)]
+        print(f"{args.messages} messages, meilleur de {args.runs} essais\n")
+        print(f"{'rendu':<18} {'µs/message':>11} {'total (s)':>10} {'blocage max (ms)':>17} {'taille (Ko)':>12}")
+        for label, fmt, render_pool in cases:
+            runs = [await measure(records, fmt, render_pool) for _ in range(args.runs)]
+            elapsed, stall, size = min(runs)
+            print(f"{label:<18} {elapsed / args.messages * 1e6:>11.1f} {elapsed:>10.3f} {stall * 1000:>17.1f} {size / 1024:>12.0f}")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,131 @@
+"""
+Recherche plein texte (/ticket_search) sur des tickets archivés synthétiques.
+
+    DATABASE_URL=postgresql://... python bench/ticket_search.py --tickets 100000
+
+Crée un schéma dédié (bench_search), y applique les migrations, insère les
+tickets avec COPY puis mesure search_ticket_logs : première page et pages
+suivantes (pagination par curseur). Le schéma est supprimé à la fin, sauf
+avec --keep (pour relancer les mesures avec --skip-seed).
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import statistics
+from types import SimpleNamespace
+
+import asyncpg
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cogs.tickets import search_ticket_logs
+from utils.migrations import migrate
+
+
+SCHEMA = "bench_search"
+WORDS = (
+    "bonjour merci ticket projet reprise joueur staff serveur règlement entretien question réponse "
+    "plainte remboursement véhicule entreprise faction gang police hôpital mairie banque garage "
+    "sanction avertissement bannissement roleplay personnage dossier candidature validation refus"
+).split()
+PLAYERS = 5000
+BATCH = 10_000
+
+
+def make_ticket(rng: random.Random, ticket_id: int, closed_at: datetime.datetime) -> tuple:
+    players = [f"joueur{rng.randrange(PLAYERS)}" for _ in range(rng.randint(1, 3))]
+    text = " ".join(rng.choices(WORDS, k=rng.randint(50, 400)) + players)
+    return (
+        ticket_id, rng.randrange(10 ** 17, 10 ** 18), f"ticket-{players[0]}", rng.randrange(10 ** 17, 10 ** 18),
+        b"\x00" * 64, "zstd", "html", text, closed_at,
+    )
+
+
+async def seed(pool, count: int):
+    rng = random.Random(1)
+    start = datetime.datetime(2024, 1, 1)
+    columns = ["ticket_id", "user_id", "channel_name", "closed_by", "transcript_data", "codec", "format", "search_text", "closed_at"]
+    began = time.perf_counter()
+    async with pool.acquire() as conn:
+        for offset in range(0, count, BATCH):
+            rows = [
+                make_ticket(rng, ticket_id, start + datetime.timedelta(minutes=7 * ticket_id))
+                for ticket_id in range(offset + 1, min(offset + BATCH, count) + 1)
+            ]
+            await conn.copy_records_to_table("ticket_logs", records=rows, columns=columns, schema_name=SCHEMA)
+            print(f"\r{offset + len(rows)} / {count} tickets", end="", flush=True)
+        await conn.execute("ANALYZE ticket_logs")
+    print(f"\nInsertion : {time.perf_counter() - began:.1f}s")
+
+
+async def timed(func, runs: int) -> tuple[float, object]:
+    durations, result = [], None
+    for _ in range(runs):
+        began = time.perf_counter()
+        result = await func()
+        durations.append(time.perf_counter() - began)
+    return statistics.median(durations), result
+
+
+async def main(args):
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        sys.exit("DATABASE_URL non défini")
+
+    admin = await asyncpg.connect(dsn)
+    if not args.skip_seed:
+        await admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await admin.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+
+    # public en second : extensions (btree_gist) déjà installées dans la base
+    pool = await asyncpg.create_pool(dsn, server_settings={"search_path": f"{SCHEMA}, public"})
+    bot = SimpleNamespace(pool=pool)
+    try:
+        await migrate(pool)
+        if not args.skip_seed:
+            await seed(pool, args.tickets)
+
+        async with pool.acquire() as conn:
+            total = await conn.fetchval("SELECT COUNT(*) FROM ticket_logs")
+            plan = "\n".join(r[0] for r in await conn.fetch(
+                "EXPLAIN SELECT ticket_id FROM ticket_logs WHERE search_vector @@ websearch_to_tsquery('french', 'joueur42')"
+            ))
+        print(f"{total} tickets, index GIN utilisé : {'oui' if 'ticket_logs_search_idx' in plan else 'NON'}\n")
+
+        queries = ["joueur42", "remboursement véhicule", '"candidature refus"', "bannissement -police", "ticket"]
+        print(f"{'recherche':<26} {'page 1 (ms)':>12} {f'page {args.pages} (ms)':>13} {'résultats p1':>13}")
+        for query in queries:
+            first, rows = await timed(lambda: search_ticket_logs(bot, query), args.runs)
+
+            # Pages suivantes : curseur (rank, ticket_id) du dernier résultat
+            cursor_rows = rows
+            for _ in range(args.pages - 2):
+                if not cursor_rows:
+                    break
+                cursor_rows = await search_ticket_logs(bot, query, after=(cursor_rows[-1]["rank"], cursor_rows[-1]["ticket_id"]))
+            if cursor_rows:
+                after = (cursor_rows[-1]["rank"], cursor_rows[-1]["ticket_id"])
+                later, _ = await timed(lambda: search_ticket_logs(bot, query, after=after), args.runs)
+                later_text = f"{later * 1000:>13.1f}"
+            else:
+                later_text = f"{'-':>13}"
+            print(f"{query:<26} {first * 1000:>12.1f} {later_text} {len(rows):>13}")
+    finally:
+        await pool.close()
+        if not args.keep:
+            await admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await admin.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, default=5, help="page mesurée après la première")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="garder le schéma de test")
+    parser.add_argument("--skip-seed", action="store_true", help="réutiliser les tickets d'un --keep précédent")
+    asyncio.run(main(parser.parse_args()))
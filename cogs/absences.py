@@ -1,4 +1,6 @@
+import time
 import discord
+import asyncpg
 import datetime
 from discord.ext import commands
 from discord import app_commands
@@ -8,6 +10,9 @@ sys.path.append("..")
 from config import EMBED_COLOR, LOGO_URL, CHANNELS, ROLES, create_embed, GUILD_ID
 
 
+SUPER_ADMINS_TTL = 24 * 3600  # secondes avant de redemander la liste complète des super admins
+
+
 def parse_date(date_str: str) -> datetime.date | None:
     """Parse une date au format JJ/MM/YYYY ou JJ/MM."""
     formats = ["%d/%m/%Y", "%d/%m"]
@@ -41,6 +46,11 @@ def format_date_full_french(dt: datetime.date) -> str:
 
 
 async def update_absences_embed(bot):
+    """Demande la mise à jour du tableau des absences (regroupée avec les autres demandes proches)."""
+    bot.panels.request("absences_panel", lambda: render_absences_embed(bot))
+
+
+async def render_absences_embed(bot):
     """Met à jour l'embed du tableau des absences."""
     print("[ABSENCES] Mise à jour de l'embed...")
     
@@ -59,25 +69,25 @@ async def update_absences_embed(bot):
         return
 
     today = datetime.date.today()
-    today_str = today.isoformat()
 
     async with bot.pool.acquire() as conn:
        
-        yesterday = (today - datetime.timedelta(days=1)).isoformat()
+        yesterday = today - datetime.timedelta(days=1)
         await conn.execute("DELETE FROM staff_absences WHERE end_date < $1", yesterday)
+        bot.absences.prune(yesterday)
 
       
-        rows = await conn.fetch("""
-            SELECT * FROM staff_absences 
-            WHERE end_date >= $1 
-            ORDER BY start_date ASC 
-            LIMIT 20
-        """, today_str)
-
-        config = await conn.fetchrow("SELECT message_id FROM persistent_messages WHERE key = 'absences_panel'")
-        message_id = config["message_id"] if config else None
+        if bot.absences.loaded:
+            rows = bot.absences.between(today)[:20]
+        else:
+            rows = await conn.fetch("""
+                SELECT * FROM staff_absences 
+                WHERE period && daterange($1, NULL) 
+                ORDER BY start_date ASC 
+                LIMIT 20
+            """, today)
 
-    print(f"[ABSENCES] {len(rows)} absence(s) trouvée(s), message_id={message_id}")
+    print(f"[ABSENCES] {len(rows)} absence(s) trouvée(s)")
 
 
     embed = discord.Embed(color=EMBED_COLOR)
@@ -99,23 +109,23 @@ async def update_absences_embed(bot):
         absences_a_venir = []
 
         for row in rows:
-            start = datetime.date.fromisoformat(row['start_date'])
-            end = datetime.date.fromisoformat(row['end_date'])
+            start = row['start_date']
+            end = row['end_date']
 
             if start <= today <= end:
                 absences_en_cours.append(row)
             elif start > today:
                 absences_a_venir.append(row)
 
+        names = await bot.names.resolve(row['staff_id'] for row in rows)
         description_lines = []
 
         if absences_en_cours:
             description_lines.append("**🔴 En cours**")
             for row in absences_en_cours:
-                user = bot.get_user(row['staff_id'])
-                user_name = user.display_name if user else f"ID:{row['staff_id']}"
-                start = datetime.date.fromisoformat(row['start_date'])
-                end = datetime.date.fromisoformat(row['end_date'])
+                user_name = names.get(row['staff_id'], f"ID:{row['staff_id']}")
+                start = row['start_date']
+                end = row['end_date']
                 reason = row['reason'] or "Non spécifiée"
 
                 days_left = (end - today).days
@@ -131,10 +141,9 @@ async def update_absences_embed(bot):
         if absences_a_venir:
             description_lines.append("**🟡 À venir**")
             for row in absences_a_venir:
-                user = bot.get_user(row['staff_id'])
-                user_name = user.display_name if user else f"ID:{row['staff_id']}"
-                start = datetime.date.fromisoformat(row['start_date'])
-                end = datetime.date.fromisoformat(row['end_date'])
+                user_name = names.get(row['staff_id'], f"ID:{row['staff_id']}")
+                start = row['start_date']
+                end = row['end_date']
                 reason = row['reason'] or "Non spécifiée"
 
                 days_until = (start - today).days
@@ -148,29 +157,16 @@ async def update_absences_embed(bot):
 
         embed.description = "\n".join(description_lines)
 
-    total_absent = len([r for r in rows if datetime.date.fromisoformat(r['start_date']) <= today <= datetime.date.fromisoformat(r['end_date'])])
+    total_absent = len([r for r in rows if r['start_date'] <= today <= r['end_date']])
     embed.set_footer(text=f"Mis à jour • {total_absent} absent{'s' if total_absent != 1 else ''} actuellement")
 
     view = AbsencesPanelView()
 
     try:
-        if message_id:
-            try:
-                msg = await channel.fetch_message(message_id)
-                await msg.edit(embed=embed, view=view)
-                print("[ABSENCES] Embed mis à jour avec succès")
-                return
-            except discord.NotFound:
-                print("[ABSENCES] Message introuvable, création d'un nouveau")
-
-        msg = await channel.send(embed=embed, view=view)
-        async with bot.pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO persistent_messages (key, message_id, channel_id) 
-                VALUES ('absences_panel', $1, $2)
-                ON CONFLICT (key) DO UPDATE SET message_id = $1, channel_id = $2
-            """, msg.id, channel.id)
-        print(f"[ABSENCES] Nouveau message créé: {msg.id}")
+        if await bot.panels.publish(bot, "absences_panel", channel, embed, view):
+            print("[ABSENCES] Embed mis à jour avec succès")
+        else:
+            print("[ABSENCES] Embed inchangé, pas de mise à jour")
 
     except Exception as e:
         print(f"[ABSENCES] Erreur: {e}")
@@ -199,14 +195,19 @@ async def notify_admins(bot, guild, staff_member, start_date, end_date, reason):
     
     recipients = []
     
-    if guild.owner:
-        recipients.append(guild.owner)
+    owner = guild.owner
+    if owner is None:
+        try:
+            owner = await guild.fetch_member(guild.owner_id)
+        except discord.HTTPException:
+            owner = None
+    if owner:
+        recipients.append(owner)
     
-    super_admin_role = guild.get_role(ROLES.get("super_admin"))
-    if super_admin_role:
-        for member in super_admin_role.members:
-            if member not in recipients and member.id != staff_member.id:
-                recipients.append(member)
+    cog = bot.get_cog("AbsencesCog")
+    for member in (await cog.get_super_admins(guild) if cog else []):
+        if member not in recipients and member.id != staff_member.id:
+            recipients.append(member)
     
     for recipient in recipients:
         try:
@@ -304,23 +305,21 @@ class AbsenceModal(discord.ui.Modal):
 
         bot = interaction.client
         if bot.pool:
-            async with bot.pool.acquire() as conn:
-                existing = await conn.fetchval("""
-                    SELECT COUNT(*) FROM staff_absences 
-                    WHERE staff_id = $1 
-                    AND NOT (end_date < $2 OR start_date > $3)
-                """, interaction.user.id, start_date.isoformat(), end_date.isoformat())
-
-                if existing > 0:
-                    return await interaction.followup.send(
-                        "❌ **Vous avez déjà une absence déclarée sur cette période.**",
-                        ephemeral=True
-                    )
-
-                await conn.execute("""
-                    INSERT INTO staff_absences (staff_id, start_date, end_date, reason)
-                    VALUES ($1, $2, $3, $4)
-                """, interaction.user.id, start_date.isoformat(), end_date.isoformat(), reason)
+            # Le chevauchement est refusé par la contrainte staff_absences_no_overlap
+            try:
+                async with bot.pool.acquire() as conn:
+                    row = await conn.fetchrow("""
+                        INSERT INTO staff_absences (staff_id, start_date, end_date, reason)
+                        VALUES ($1, $2, $3, $4)
+                        RETURNING id, staff_id, start_date, end_date, reason
+                    """, interaction.user.id, start_date, end_date, reason)
+            except asyncpg.ExclusionViolationError:
+                return await interaction.followup.send(
+                    "❌ **Vous avez déjà une absence déclarée sur cette période.**",
+                    ephemeral=True
+                )
+            bot.absences.add(row)
+            bot.availability.invalidate(interaction.user.id)
                 
             print(f"[ABSENCES] Nouvelle absence enregistrée pour {interaction.user.name}")
 
@@ -356,8 +355,8 @@ class ManageAbsenceView(discord.ui.View):
 
         options = []
         for absence in absences:
-            start = datetime.date.fromisoformat(absence['start_date'])
-            end = datetime.date.fromisoformat(absence['end_date'])
+            start = absence['start_date']
+            end = absence['end_date']
             label = f"{format_date_french(start)} → {format_date_french(end)}"
             reason = absence['reason'][:50] if absence['reason'] else "Sans raison"
 
@@ -382,14 +381,15 @@ class ManageAbsenceView(discord.ui.View):
 
         async with self.bot.pool.acquire() as conn:
             absence = await conn.fetchrow(
-                "SELECT * FROM staff_absences WHERE id = $1 AND staff_id = $2",
+                "DELETE FROM staff_absences WHERE id = $1 AND staff_id = $2 RETURNING id",
                 absence_id, self.user_id
             )
 
-            if not absence:
-                return await interaction.response.send_message("❌ Absence introuvable.", ephemeral=True)
+        if not absence:
+            return await interaction.response.send_message("❌ Absence introuvable.", ephemeral=True)
 
-            await conn.execute("DELETE FROM staff_absences WHERE id = $1", absence_id)
+        self.bot.absences.remove(absence_id)
+        self.bot.availability.invalidate(self.user_id)
 
         await update_absences_embed(self.bot)
 
@@ -403,22 +403,77 @@ class ManageAbsenceView(discord.ui.View):
 class AbsencesCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # IDs des super admins quand les membres ne sont pas tous en cache (LEAN_MEMORY_MODE)
+        self.super_admin_ids = None
+        self._super_admins_at = 0.0
+
+    async def get_super_admins(self, guild: discord.Guild) -> list[discord.Member]:
+        """
+        Membres ayant le rôle super admin. Serveur non chargé en entier : la
+        liste des membres n'est parcourue qu'une fois par SUPER_ADMINS_TTL (sans
+        rien garder en mémoire), puis seuls les super admins sont mis en cache.
+        on_member_update suit ensuite leurs changements de rôles.
+        """
+        role = guild.get_role(ROLES.get("super_admin"))
+        if not role:
+            return []
+        if guild.chunked:
+            return role.members
+
+        if self.super_admin_ids is None or time.monotonic() - self._super_admins_at > SUPER_ADMINS_TTL:
+            try:
+                members = await guild.chunk(cache=False)
+                self.super_admin_ids = {member.id for member in members if member.get_role(role.id)}
+                self._super_admins_at = time.monotonic()
+                print(f"[ABSENCES] {len(self.super_admin_ids)} super admin(s) trouvé(s)")
+            except Exception as e:
+                print(f"[ABSENCES] Erreur récupération des super admins: {e}")
+                if self.super_admin_ids is None:
+                    return role.members
+
+        missing = [user_id for user_id in self.super_admin_ids if guild.get_member(user_id) is None]
+        if missing:
+            try:
+                await guild.query_members(user_ids=missing[:100], limit=100, cache=True)
+            except Exception as e:
+                print(f"[ABSENCES] Erreur récupération des super admins: {e}")
+        return [member for member in map(guild.get_member, self.super_admin_ids) if member and member.get_role(role.id)]
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if self.super_admin_ids is None or before.roles == after.roles:
+            return
+        if after.get_role(ROLES.get("super_admin")):
+            self.super_admin_ids.add(after.id)
+        else:
+            self.super_admin_ids.discard(after.id)
 
     async def cog_load(self):
         self.bot.add_view(AbsencesPanelView())
 
-        if self.bot.pool:
-            async with self.bot.pool.acquire() as conn:
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS staff_absences (
-                        id SERIAL PRIMARY KEY,
-                        staff_id BIGINT NOT NULL,
-                        start_date TEXT NOT NULL,
-                        end_date TEXT NOT NULL,
-                        reason TEXT,
-                        created_at TIMESTAMP DEFAULT NOW()
-                    );
-                """)
+        if self.bot.notify:
+            self.bot.notify.subscribe("staff_absences", self.on_absences_changed)
+        self.bot.startup.register("absence_index", self.load_absence_index, needs=("db",))
+        self.bot.startup.register("absences_panel", lambda: update_absences_embed(self.bot), needs=("db", "ready"))
+
+    async def load_absence_index(self):
+        await self.bot.absences.load(self.bot.pool, datetime.date.today() - datetime.timedelta(days=1))
+
+    async def on_absences_changed(self, event: dict):
+        """staff_absences modifiée (autre instance, édition directe en base...)."""
+        if event["op"] in ("RESYNC", "TRUNCATE"):
+            await self.load_absence_index()
+            self.bot.availability.invalidate()
+        else:
+            if event.get("old"):
+                self.bot.absences.remove(event["old"]["id"])
+                self.bot.availability.invalidate(event["old"]["staff_id"])
+            if event.get("new"):
+                row = event["new"]
+                row["start_date"] = datetime.date.fromisoformat(row["start_date"])
+                row["end_date"] = datetime.date.fromisoformat(row["end_date"])
+                self.bot.absences.add(row)
+                self.bot.availability.invalidate(row["staff_id"])
 
         await update_absences_embed(self.bot)
 
@@ -442,12 +497,8 @@ class AbsencesCog(commands.Cog):
         msg = await interaction.channel.send(embed=embed, view=AbsencesPanelView())
 
         if self.bot.pool:
-            async with self.bot.pool.acquire() as conn:
-                await conn.execute("""
-                    INSERT INTO persistent_messages (key, message_id, channel_id) 
-                    VALUES ('absences_panel', $1, $2)
-                    ON CONFLICT (key) DO UPDATE SET message_id = $1, channel_id = $2
-                """, msg.id, interaction.channel.id)
+            await self.bot.panels.set_handle(self.bot.pool, "absences_panel", interaction.channel.id, msg.id)
+            await update_absences_embed(self.bot)
 
         await interaction.response.send_message("✅ Panneau des absences installé.", ephemeral=True)
 
@@ -463,14 +514,17 @@ class AbsencesCog(commands.Cog):
         if not self.bot.pool:
             return await interaction.response.send_message("❌ BDD indisponible.", ephemeral=True)
 
-        today = datetime.date.today().isoformat()
+        today = datetime.date.today()
 
-        async with self.bot.pool.acquire() as conn:
-            absences = await conn.fetch("""
-                SELECT * FROM staff_absences 
-                WHERE staff_id = $1 AND end_date >= $2
-                ORDER BY start_date ASC
-            """, interaction.user.id, today)
+        if self.bot.absences.loaded:
+            absences = self.bot.absences.between(today, staff_id=interaction.user.id)
+        else:
+            async with self.bot.pool.acquire() as conn:
+                absences = await conn.fetch("""
+                    SELECT * FROM staff_absences 
+                    WHERE staff_id = $1 AND period && daterange($2, NULL)
+                    ORDER BY start_date ASC
+                """, interaction.user.id, today)
 
         if not absences:
             return await interaction.response.send_message(
@@ -486,8 +540,8 @@ class AbsencesCog(commands.Cog):
 
         lines = []
         for absence in absences:
-            start = datetime.date.fromisoformat(absence['start_date'])
-            end = datetime.date.fromisoformat(absence['end_date'])
+            start = absence['start_date']
+            end = absence['end_date']
             reason = absence['reason'] or "Non spécifiée"
             lines.append(f"• `{format_date_french(start)}` → `{format_date_french(end)}`\n　_{reason}_")
 
@@ -509,6 +563,8 @@ class AbsencesCog(commands.Cog):
         async with self.bot.pool.acquire() as conn:
             result = await conn.execute("DELETE FROM staff_absences")
             count = int(result.split(" ")[1]) if result else 0
+        self.bot.absences.clear()
+        self.bot.availability.invalidate()
 
         await update_absences_embed(self.bot)
 
@@ -552,11 +608,20 @@ class AbsencesCog(commands.Cog):
         if not self.bot.pool:
             return await interaction.response.send_message("❌ BDD indisponible.", ephemeral=True)
 
-        async with self.bot.pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO staff_absences (staff_id, start_date, end_date, reason)
-                VALUES ($1, $2, $3, $4)
-            """, membre.id, start_date.isoformat(), end_date.isoformat(), raison)
+        try:
+            async with self.bot.pool.acquire() as conn:
+                row = await conn.fetchrow("""
+                    INSERT INTO staff_absences (staff_id, start_date, end_date, reason)
+                    VALUES ($1, $2, $3, $4)
+                    RETURNING id, staff_id, start_date, end_date, reason
+                """, membre.id, start_date, end_date, raison)
+        except asyncpg.ExclusionViolationError:
+            return await interaction.response.send_message(
+                f"❌ **{membre.display_name}** a déjà une absence déclarée sur cette période.",
+                ephemeral=True
+            )
+        self.bot.absences.add(row)
+        self.bot.availability.invalidate(membre.id)
 
         await update_absences_embed(self.bot)
 
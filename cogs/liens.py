@@ -4,12 +4,19 @@ from discord import app_commands
 import sys
 sys.path.append("..")
 from config import EMBED_COLOR, LOGO_URL, CHANNELS, create_embed
+from utils.prefix import PrefixIndex
 
 class LiensCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Libellés des liens pour l'autocomplétion de /removelien
+        self.links_index = PrefixIndex()
 
     async def update_links_embed(self):
+        """Demande la mise à jour de l'embed des liens (regroupée avec les autres demandes proches)."""
+        self.bot.panels.request("links_embed", self.render_links_embed)
+
+    async def render_links_embed(self):
         """Met à jour ou crée l'embed des liens utiles."""
         channel_id = CHANNELS.get("liens_utiles")
         if not channel_id or channel_id == 0:
@@ -25,8 +32,6 @@ class LiensCog(commands.Cog):
         
         async with self.bot.pool.acquire() as conn:
             links = await conn.fetch("SELECT label, url FROM useful_links ORDER BY label ASC")
-            config = await conn.fetchrow("SELECT message_id FROM persistent_messages WHERE key = 'links_embed'")
-            message_id = config["message_id"] if config else None
 
 
         embed = discord.Embed(color=EMBED_COLOR)
@@ -49,36 +54,43 @@ class LiensCog(commands.Cog):
             embed.set_footer(text="Remember RolePlay • Liens Officiels")
 
         try:
-            if message_id:
-                try:
-                    msg = await channel.fetch_message(message_id)
-                    await msg.edit(embed=embed)
-                    return
-                except discord.NotFound:
-                    pass 
-
-
-            is_empty = True
-            async for _ in channel.history(limit=1):
-                is_empty = False
-                break
-            
-            if is_empty:
-                msg = await channel.send(embed=embed)
-                async with self.bot.pool.acquire() as conn:
-                    await conn.execute("""
-                        INSERT INTO persistent_messages (key, message_id, channel_id) 
-                        VALUES ('links_embed', $1, $2)
-                        ON CONFLICT (key) DO UPDATE SET message_id = $1, channel_id = $2
-                    """, msg.id, channel.id)
-            else:
-                print("[LIENS] Salon non vide et pas de message enregistré, envoi annulé.")
+            await self.bot.panels.publish(self.bot, "links_embed", channel, embed, can_create=self._channel_is_empty)
 
         except Exception as e:
             print(f"[LIENS] Erreur update: {e}")
 
-    @commands.Cog.listener()
-    async def on_ready(self):
+    async def _channel_is_empty(self) -> bool:
+        """Le panneau n'est recréé que dans un salon vide."""
+        channel = self.bot.get_channel(CHANNELS.get("liens_utiles"))
+        async for _ in channel.history(limit=1):
+            print("[LIENS] Salon non vide et pas de message enregistré, envoi annulé.")
+            return False
+        return True
+
+    async def cog_load(self):
+        if self.bot.notify:
+            self.bot.notify.subscribe("useful_links", self.on_links_changed)
+        self.bot.startup.register("links_index", self.load_links_index, needs=("db",))
+        self.bot.startup.register("links_panel", self.update_links_embed, needs=("db", "ready"))
+
+        # Extension rechargée : la tâche de démarrage links_index ne sera pas relancée
+        if self.bot.startup.reached("db"):
+            await self.load_links_index()
+
+    async def load_links_index(self):
+        async with self.bot.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT label FROM useful_links")
+        self.links_index.rebuild((row["label"], row["label"]) for row in rows)
+
+    async def on_links_changed(self, event: dict):
+        """useful_links modifiée (autre instance, édition directe en base...)."""
+        if event["op"] in ("RESYNC", "TRUNCATE"):
+            await self.load_links_index()
+        else:
+            if event.get("old"):
+                self.links_index.remove(event["old"]["label"])
+            if event.get("new"):
+                self.links_index.add(event["new"]["label"], event["new"]["label"])
         await self.update_links_embed()
 
     @app_commands.command(name="addlien", description="Ajouter un lien utile (Admin)")
@@ -99,6 +111,7 @@ class LiensCog(commands.Cog):
                 ON CONFLICT (label) DO UPDATE SET url = $2
             """, nom, url)
 
+        self.links_index.add(nom, nom)
         await self.update_links_embed()
         await interaction.followup.send(f"✅ Lien **{nom}** ajouté/mis à jour.")
 
@@ -116,8 +129,13 @@ class LiensCog(commands.Cog):
         if result == "DELETE 0":
             await interaction.followup.send(f"❌ Le lien **{nom}** n'existe pas.", ephemeral=True)
         else:
+            self.links_index.remove(nom)
             await self.update_links_embed()
             await interaction.followup.send(f"✅ Lien **{nom}** supprimé.", ephemeral=True)
 
+    @remove_lien.autocomplete("nom")
+    async def remove_lien_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return [app_commands.Choice(name=label, value=value) for label, value in self.links_index.search(current)]
+
 async def setup(bot):
     await bot.add_cog(LiensCog(bot))
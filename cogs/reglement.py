@@ -39,9 +39,11 @@ class ReglementCog(commands.Cog):
             await channel.send(embed=embed, view=view)
             print(f"[REGLEMENT] Embed envoyé dans {channel.name}")
 
-    @commands.Cog.listener()
-    async def on_ready(self):
+    async def cog_load(self):
+        self.bot.startup.register("reglement_gen", self.send_reglement_gen)
+        self.bot.startup.register("reglement_discord", self.send_reglement_discord)
 
+    async def send_reglement_gen(self):
         await self.check_and_send_reglement(
             "reglement_gen",
             "Règlement Général",
@@ -50,7 +52,7 @@ class ReglementCog(commands.Cog):
             "Lire le Règlement"
         )
 
-
+    async def send_reglement_discord(self):
         await self.check_and_send_reglement(
             "reglement_discord",
             "Règlement Discord",
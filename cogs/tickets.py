@@ -1,15 +1,37 @@
 import discord
 import io
+import os
+import gzip
+import shutil
+import json
+import asyncio
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import datetime
 import aiohttp
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 
 import sys
 sys.path.append("..")
-from config import EMBED_COLOR, LOGO_URL, CHANNELS, ROLES, create_embed, GUILD_ID
-
-
+from config import EMBED_COLOR, LOGO_URL, CHANNELS, ROLES, create_embed, GUILD_ID, TRANSCRIPT_MAX_MEMORY, TRANSCRIPT_GZIP, TRANSCRIPT_FORMAT, TRANSCRIPT_RENDER_WORKERS
+from config import RDV_SLOT_LENGTH, RDV_STAFF_CAPACITY
+from config import ATTACHMENTS_DIR, ATTACHMENTS_BASE_URL, ATTACHMENTS_CONCURRENCY, ATTACHMENTS_MAX_BYTES, LOGS_RETENTION_DAYS
+from utils import transcript_html
+from utils.archive import AttachmentArchiver, is_digest
+from utils.command_sync import sync_command_tree
+from utils.prefix import PrefixIndex
+from utils.retention import is_partitioned, ensure_log_partitions, purge_ticket_logs, purge_ticket_messages, ticket_logs_stats
+
+
+TRANSCRIPT_CHUNK_SIZE = 64 * 1024
+TRANSCRIPT_RENDER_BATCH = 500  # messages rendus par appel au pool de processus
+SEARCH_TEXT_MAX = 500_000  # caractères indexés par ticket (un tsvector est limité à 1 Mo)
+SEARCH_PAGE_SIZE = 10
+RDV_HOURS = ["17h00", "18h00", "19h00", "20h00", "21h00", "22h00"]
+CAPTURE_FLUSH_INTERVAL = 5  # secondes entre deux écritures des messages capturés
+CAPTURE_FLUSH_BATCH = 200  # flush immédiat au-delà de ce nombre de messages en attente
 
 DEFAULT_REPRISE_PROJECTS = [
     {"name": "Fermier", "priority": False},
@@ -111,22 +133,241 @@ def format_date_french(day_name: str, hour_str: str) -> str:
     return f"{day_name_fr} {dt.day} {month_name} à {hour_str}"
 
 
-async def generate_transcript(channel: discord.TextChannel) -> io.StringIO:
-    """Génère un fichier texte contenant l'historique du salon."""
-    lines = [
-        f"TRANSCRIPT - {channel.name}",
-        f"Date : {datetime.datetime.now().strftime('%d/%m/%Y %H:%M')}",
-        "-" * 50, ""
-    ]
-    
+def message_to_record(message: discord.Message) -> dict:
+    """Convertit un message Discord en dict simple (capture BDD et rendu des transcripts)."""
+    roles = getattr(message.author, "roles", [])
+    return {
+        "message_id": message.id,
+        "ticket_id": message.channel.id,
+        "author_id": message.author.id,
+        "author_name": message.author.name,
+        "content": message.content,
+        "original_content": None,
+        "attachments": [a.url for a in message.attachments],
+        "attachment_hashes": [],
+        "embeds": [e.to_dict() for e in message.embeds],
+        "reply_to": message.reference.message_id if message.reference else None,
+        "is_staff": any(r.id == ROLES["support"] for r in roles),
+        "created_at": message.created_at,
+        "edited_at": None,
+        "deleted": False
+    }
+
+
+async def iter_history_records(channel: discord.TextChannel):
+    """Parcourt l'historique Discord du salon (tickets ouverts avant la capture)."""
     async for msg in channel.history(limit=None, oldest_first=True):
-        timestamp = msg.created_at.strftime('%d/%m %H:%M')
-        content = msg.content
-        if msg.attachments:
-            content += f" [Fichier: {msg.attachments[0].url}]"
-        lines.append(f"[{timestamp}] {msg.author.name}: {content}")
-    
-    return io.StringIO("\n".join(lines))
+        yield message_to_record(msg)
+
+
+async def capture_started_at(bot) -> datetime.datetime | None:
+    """Date de mise en service de la capture des messages (bot_state, migration 0008)."""
+    if not bot.pool:
+        return None
+    async with bot.pool.acquire() as conn:
+        value = await conn.fetchval("SELECT value FROM bot_state WHERE key = 'ticket_capture_since'")
+    return datetime.datetime.fromisoformat(value) if value else None
+
+
+async def iter_captured_records(bot, ticket_id: int):
+    """Parcourt les messages capturés en BDD avec un curseur côté serveur."""
+    async with bot.pool.acquire() as conn:
+        async with conn.transaction():
+            async for row in conn.cursor("""
+                SELECT * FROM ticket_messages
+                WHERE ticket_id = $1
+                ORDER BY created_at ASC, message_id ASC
+            """, ticket_id, prefetch=TRANSCRIPT_RENDER_BATCH):
+                record = dict(row)
+                record["embeds"] = json.loads(record["embeds"]) if record["embeds"] else []
+                yield record
+
+
+def format_record_line(record: dict) -> str:
+    """Ligne texte d'un message : [dd/mm HH:MM] nom: contenu"""
+    content = record["content"] or ""
+    hashes = record.get("attachment_hashes") or []
+    for i, url in enumerate(record["attachments"] or []):
+        digest = hashes[i] if i < len(hashes) else None
+        content += f" [Fichier: {url} sha256:{digest}]" if digest else f" [Fichier: {url}]"
+    if record["edited_at"] and record["original_content"] is not None:
+        content += f" (modifié, original : {record['original_content']})"
+    if record["deleted"]:
+        content = f"[SUPPRIMÉ] {content}"
+    timestamp = record["created_at"].strftime('%d/%m %H:%M')
+    return f"[{timestamp}] {record['author_name']}: {content}\n"
+
+
+class TranscriptWriter:
+    """
+    Écrit un transcript au fil de l'eau dans un fichier temporaire.
+    Le fichier reste en RAM jusqu'à TRANSCRIPT_MAX_MEMORY puis bascule sur le disque.
+    """
+
+    def __init__(self, compress: bool = TRANSCRIPT_GZIP):
+        self.compress = compress
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=TRANSCRIPT_MAX_MEMORY)
+        self.raw = gzip.GzipFile(fileobj=self.buffer, mode="wb") if compress else self.buffer
+        self.writer = io.TextIOWrapper(self.raw, encoding="utf-8", newline="\n")
+
+    def write(self, text: str):
+        self.writer.write(text)
+
+    def finish(self):
+        """Ferme l'écriture et renvoie le fichier rembobiné."""
+        self.writer.flush()
+        self.writer.detach()
+        if self.compress:
+            self.raw.close()
+        self.buffer.seek(0)
+        return self.buffer
+
+
+async def render_html_batch(render_pool, batch: list, reply_authors: dict) -> str:
+    """Rend un lot de messages en HTML dans le pool de processus."""
+    needed = {r["reply_to"]: reply_authors[r["reply_to"]] for r in batch if r.get("reply_to") in reply_authors}
+    if render_pool is None:
+        return transcript_html.render_messages(batch, needed, ATTACHMENTS_BASE_URL)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(render_pool, transcript_html.render_messages, batch, needed, ATTACHMENTS_BASE_URL)
+
+
+async def generate_transcript(channel_name: str, records, fmt: str = TRANSCRIPT_FORMAT, compress: bool = TRANSCRIPT_GZIP, render_pool=None, on_record=None):
+    """
+    Génère le transcript en flux à partir d'un itérateur asynchrone de messages.
+    fmt = "html" (rendu dans render_pool) ou "txt".
+    on_record est appelé sur chaque message (ex: collecte du texte pour la recherche).
+    """
+    transcript = TranscriptWriter(compress)
+    now = datetime.datetime.now()
+
+    if fmt == "html":
+        transcript.write(transcript_html.render_header(channel_name, now))
+        batch, reply_authors, count = [], {}, 0
+
+        async for record in records:
+            if on_record:
+                on_record(record)
+            reply_authors[record["message_id"]] = record["author_name"]
+            batch.append(record)
+            count += 1
+            if len(batch) >= TRANSCRIPT_RENDER_BATCH:
+                transcript.write(await render_html_batch(render_pool, batch, reply_authors))
+                batch = []
+
+        if batch:
+            transcript.write(await render_html_batch(render_pool, batch, reply_authors))
+        transcript.write(transcript_html.render_footer(count))
+    else:
+        transcript.write(f"TRANSCRIPT - {channel_name}\n")
+        transcript.write(f"Date : {now.strftime('%d/%m/%Y %H:%M')}\n")
+        transcript.write("-" * 50 + "\n\n")
+        async for record in records:
+            if on_record:
+                on_record(record)
+            transcript.write(format_record_line(record))
+
+    return transcript.finish()
+
+
+class SearchTextCollector:
+    """Accumule le texte brut d'un ticket pour la recherche plein texte (taille bornée)."""
+
+    def __init__(self, limit: int = SEARCH_TEXT_MAX):
+        self.limit = limit
+        self.size = 0
+        self.parts = []
+
+    def __call__(self, record: dict):
+        if self.size >= self.limit:
+            return
+        parts = [record["author_name"], record["content"], record.get("original_content")]
+        for embed in record.get("embeds") or []:
+            parts += [embed.get("title"), embed.get("description")]
+            parts += [f"{f.get('name')} {f.get('value')}" for f in embed.get("fields") or []]
+        text = " ".join(p for p in parts if p)[:self.limit - self.size]
+        self.parts.append(text)
+        self.size += len(text) + 1
+
+    def text(self) -> str:
+        return "\n".join(self.parts)
+
+
+def transcript_filename(channel_name: str, fmt: str = TRANSCRIPT_FORMAT, compress: bool = TRANSCRIPT_GZIP) -> str:
+    return f"{channel_name}.{fmt}" + (".gz" if compress else "")
+
+
+def ticket_index_entry(ticket_id: int, channel_name: str | None) -> tuple:
+    """(label, valeur, clés) d'un ticket archivé : recherche par nom de salon ou par ID."""
+    name = channel_name or "ticket"
+    return f"{name} ({ticket_id})"[:100], str(ticket_id), (name, str(ticket_id))
+
+
+def get_ticket_owner_id(channel: discord.TextChannel) -> int | None:
+    """Récupère l'ID du propriétaire depuis le topic du ticket."""
+    topic = channel.topic or ""
+    if "Propriétaire:" not in topic:
+        return None
+    try:
+        return int(topic.split("Propriétaire:")[1].split("|")[0].strip())
+    except ValueError:
+        return None
+
+
+def compress_transcript(fp, already_compressed: bool = TRANSCRIPT_GZIP) -> tuple[bytes, str]:
+    """Compresse le transcript pour la BDD. Retourne (données, codec)."""
+    fp.seek(0)
+    if already_compressed:
+        data = fp.read()
+    else:
+        out = io.BytesIO()
+        with gzip.GzipFile(fileobj=out, mode="wb") as gz:
+            shutil.copyfileobj(fp, gz, TRANSCRIPT_CHUNK_SIZE)
+        data = out.getvalue()
+    fp.seek(0)
+    return data, "gzip"
+
+
+def transcript_upload(fp, filename: str, limit: int, gzip_data: bytes | None = None) -> discord.File | None:
+    """
+    Fichier à envoyer sur Discord dans la limite d'upload du serveur : le transcript
+    tel quel, sinon sa version gzip (celle stockée en BDD). None si trop gros malgré tout.
+    """
+    fp.seek(0, io.SEEK_END)
+    size = fp.tell()
+    fp.seek(0)
+    if size <= limit:
+        return discord.File(fp, filename=filename)
+    if gzip_data is not None and len(gzip_data) <= limit:
+        return discord.File(io.BytesIO(gzip_data), filename=filename if filename.endswith(".gz") else f"{filename}.gz")
+    return None
+
+
+def decompress_transcript(data: bytes, codec: str):
+    """Décompresse un transcript stocké vers un fichier temporaire."""
+    buffer = tempfile.SpooledTemporaryFile(max_size=TRANSCRIPT_MAX_MEMORY)
+    if codec == "gzip":
+        with gzip.GzipFile(fileobj=io.BytesIO(data), mode="rb") as gz:
+            shutil.copyfileobj(gz, buffer, TRANSCRIPT_CHUNK_SIZE)
+    else:
+        buffer.write(data)
+    buffer.seek(0)
+    return buffer
+
+
+async def save_transcript(bot, ticket_id: int, channel_name: str, user_id: int | None, closed_by: int, data: bytes, codec: str, fmt: str, search_text: str = None):
+    """Enregistre le transcript compressé dans ticket_logs."""
+    if not bot.pool:
+        return
+    async with bot.pool.acquire() as conn:
+        # Pas d'ON CONFLICT : la clé primaire inclut closed_at quand la table est partitionnée
+        async with conn.transaction():
+            await conn.execute("DELETE FROM ticket_logs WHERE ticket_id = $1", ticket_id)
+            await conn.execute("""
+                INSERT INTO ticket_logs (ticket_id, user_id, channel_name, closed_by, transcript_data, codec, format, search_text)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            """, ticket_id, user_id, channel_name, closed_by, data, codec, fmt, search_text)
+    print(f"[TICKETS] Transcript {channel_name} enregistré ({len(data)} octets)")
 
 
 async def create_reprise_ticket(interaction: discord.Interaction, project_name: str, is_priority: bool, motivation: str, details: str, doc: str = None):
@@ -190,6 +431,11 @@ async def create_reprise_ticket(interaction: discord.Interaction, project_name:
 
 
 async def update_planning_embed(bot):
+    """Demande la mise à jour du planning (regroupée avec les autres demandes proches)."""
+    bot.panels.request("rdv_planning", lambda: render_planning_embed(bot))
+
+
+async def render_planning_embed(bot):
     """Met à jour l'embed du planning des rendez-vous - Style PRO et organisé."""
     if not bot.pool:
         return
@@ -208,6 +454,7 @@ async def update_planning_embed(bot):
     async with bot.pool.acquire() as conn:
 
         await conn.execute("DELETE FROM rdv_planning WHERE rdv_timestamp < $1", current_ts - 7200)
+        bot.slots.prune(current_ts - 7200)
 
 
         rows = await conn.fetch("""
@@ -217,8 +464,6 @@ async def update_planning_embed(bot):
             LIMIT 15
         """, current_ts - 3600)
         
-        config = await conn.fetchrow("SELECT message_id FROM persistent_messages WHERE key = 'rdv_planning'")
-        message_id = config["message_id"] if config else None
 
     
     embed = discord.Embed(color=EMBED_COLOR)
@@ -239,7 +484,8 @@ async def update_planning_embed(bot):
             if day_key not in rdv_by_day:
                 rdv_by_day[day_key] = []
             rdv_by_day[day_key].append(row)
-        
+
+        names = await bot.names.resolve([row['user_id'] for row in rows] + [row['staff_id'] for row in rows])
         description_lines = []
         
         for day_key in sorted(rdv_by_day.keys()):
@@ -255,22 +501,21 @@ async def update_planning_embed(bot):
             
             description_lines.append(f"▸ **{date_formatted}**")
             
+            # Entretiens simultanés (staff différents) regroupés sous la même heure
+            rdv_by_hour = {}
             for row in day_rows:
-                user = bot.get_user(row['user_id'])
-                staff = bot.get_user(row['staff_id'])
-                ts = row['rdv_timestamp']
-                
-                user_name = user.display_name if user else "Inconnu"
-                staff_name = staff.display_name if staff else "Staff"
-                
-                
-                hour_dt = datetime.datetime.fromtimestamp(ts)
-                hour_str = f"{hour_dt.hour:02d}h{hour_dt.minute:02d}"
-                
-                
-                description_lines.append(
-                    f"　`{hour_str}`  {user_name}  ›  {staff_name}"
-                )
+                hour_dt = datetime.datetime.fromtimestamp(row['rdv_timestamp'])
+                rdv_by_hour.setdefault(f"{hour_dt.hour:02d}h{hour_dt.minute:02d}", []).append(row)
+
+            for hour_str, hour_rows in rdv_by_hour.items():
+                for i, row in enumerate(hour_rows):
+                    user_name = names.get(row['user_id'], "Inconnu")
+                    staff_name = names.get(row['staff_id'], "Staff")
+                    
+                    prefix = f"`{hour_str}`" if i == 0 else "`     `"
+                    description_lines.append(
+                        f"　{prefix}  {user_name}  ›  {staff_name}"
+                    )
             
             description_lines.append("")
         
@@ -282,22 +527,7 @@ async def update_planning_embed(bot):
     view = PlanningManagementView(bot) if rows else None
 
     try:
-        if message_id:
-            try:
-                msg = await channel.fetch_message(message_id)
-                await msg.edit(embed=embed, view=view)
-                return
-            except discord.NotFound:
-                pass
-        
-        msg = await channel.send(embed=embed, view=view)
-        async with bot.pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO persistent_messages (key, message_id, channel_id) 
-                VALUES ('rdv_planning', $1, $2)
-                ON CONFLICT (key) DO UPDATE SET message_id = $1
-            """, msg.id, channel.id)
-            
+        await bot.panels.publish(bot, "rdv_planning", channel, embed, view)
     except Exception as e:
         print(f"Erreur update planning: {e}")
 
@@ -323,28 +553,33 @@ class PlanningManagementView(discord.ui.View):
         
         current_ts = int(datetime.datetime.now().timestamp())
         
-        async with self.bot.pool.acquire() as conn:
-            rows = await conn.fetch("""
-                SELECT * FROM rdv_planning 
-                WHERE rdv_timestamp > $1 
-                ORDER BY rdv_timestamp ASC 
-                LIMIT 25
-            """, current_ts - 3600)
+        if self.bot.slots.loaded:
+            rows = self.bot.slots.upcoming(current_ts - 3600, limit=25)
+        else:
+            async with self.bot.pool.acquire() as conn:
+                rows = await conn.fetch("""
+                    SELECT * FROM rdv_planning 
+                    WHERE rdv_timestamp > $1 
+                    ORDER BY rdv_timestamp ASC 
+                    LIMIT 25
+                """, current_ts - 3600)
         
         if not rows:
             return await interaction.response.send_message("❌ Aucun RDV à annuler.", ephemeral=True)
-        
-   
+
+        # Les membres manquants peuvent nécessiter une requête gateway
+        await interaction.response.defer(ephemeral=True)
+        names = await self.bot.names.resolve(row['user_id'] for row in rows)
+
         options = []
         days_fr = ["Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim"]
         months_fr = ["jan", "fév", "mar", "avr", "mai", "juin", "juil", "août", "sep", "oct", "nov", "déc"]
         
         for row in rows:
-            user = self.bot.get_user(row['user_id'])
             ts = row['rdv_timestamp']
             dt = datetime.datetime.fromtimestamp(ts)
             
-            user_name = user.display_name if user else "Inconnu"
+            user_name = names.get(row['user_id'], "Inconnu")
             day_name = days_fr[dt.weekday()]
             month_name = months_fr[dt.month - 1]
             hour_str = f"{dt.hour:02d}h{dt.minute:02d}"
@@ -356,7 +591,7 @@ class PlanningManagementView(discord.ui.View):
                 value=str(row['id'])
             ))
         
-        await interaction.response.send_message(
+        await interaction.followup.send(
             "**Sélectionnez le RDV à annuler :**",
             view=CancelRDVSelectView(self.bot, options),
             ephemeral=True
@@ -384,14 +619,12 @@ class CancelRDVSelectView(discord.ui.View):
             return await interaction.response.send_message("❌ Erreur BDD.", ephemeral=True)
         
         async with self.bot.pool.acquire() as conn:
-            
-            row = await conn.fetchrow("SELECT * FROM rdv_planning WHERE id = $1", rdv_id)
-            
-            if not row:
-                return await interaction.response.send_message("❌ RDV introuvable.", ephemeral=True)
-            
- 
-            await conn.execute("DELETE FROM rdv_planning WHERE id = $1", rdv_id)
+            row = await conn.fetchrow("DELETE FROM rdv_planning WHERE id = $1 RETURNING *", rdv_id)
+
+        self.bot.slots.remove(rdv_id)
+
+        if not row:
+            return await interaction.response.send_message("❌ RDV introuvable.", ephemeral=True)
         
 
         await update_planning_embed(self.bot)
@@ -533,22 +766,82 @@ class TicketModal(discord.ui.Modal):
 
 
 
-async def check_slot_available(bot, timestamp: int) -> bool:
-    """Vérifie si un créneau est disponible (pas déjà pris)."""
+async def check_slot_available(bot, timestamp: int, staff_id: int) -> bool:
+    """Vérifie si le membre du staff a encore une place libre sur ce créneau."""
     if not bot.pool:
         return True
+
+    if bot.slots.loaded:
+        return bot.slots.is_free(timestamp, staff_id)
     
     async with bot.pool.acquire() as conn:
 
-        existing = await conn.fetchval("""
-            SELECT COUNT(*) FROM rdv_planning 
-            WHERE ABS(rdv_timestamp - $1) < 1800
-        """, timestamp)
-        return existing == 0
+        taken = await conn.fetchval("""
+            SELECT COUNT(*) FROM rdv_planning
+            WHERE staff_id = $1
+            AND int8range(rdv_timestamp, rdv_end) && int8range($2, $3)
+        """, staff_id, timestamp, timestamp + RDV_SLOT_LENGTH * 60)
+        return taken < RDV_STAFF_CAPACITY
+
+
+async def book_rdv_slot(bot, user_id: int, staff_id: int, day: str, hour: str, ts: int, channel_id: int):
+    """
+    Réserve le créneau sur une voie libre du staff (contrainte rdv_planning_staff_no_overlap).
+    Retourne (RDV réservé, None) si réservé, sinon (None, un RDV en conflit).
+    """
+    end = ts + RDV_SLOT_LENGTH * 60
+    conflicts = []
+    async with bot.pool.acquire() as conn:
+        for _ in range(RDV_STAFF_CAPACITY):
+            row = await conn.fetchrow("""
+                WITH free_lane AS (
+                    SELECT l.lane FROM generate_series(0, $8 - 1) AS l(lane)
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM rdv_planning r
+                        WHERE r.staff_id = $2 AND r.lane = l.lane
+                        AND int8range(r.rdv_timestamp, r.rdv_end) && int8range($5, $7)
+                    )
+                    ORDER BY l.lane
+                    LIMIT 1
+                ), ins AS (
+                    INSERT INTO rdv_planning (user_id, staff_id, day, hour, rdv_timestamp, rdv_end, lane, channel_id)
+                    SELECT $1, $2, $3, $4, $5, $7, lane, $6 FROM free_lane
+                    ON CONFLICT DO NOTHING
+                    RETURNING id, user_id, staff_id, day, hour, rdv_timestamp, rdv_end, lane, channel_id
+                )
+                SELECT * FROM ins
+            """, user_id, staff_id, day, hour, ts, channel_id, end, RDV_STAFF_CAPACITY)
+            if row:
+                return dict(row), None
+
+            conflicts = await conn.fetch("""
+                SELECT id, user_id, staff_id, day, hour, rdv_timestamp, rdv_end, lane, channel_id
+                FROM rdv_planning
+                WHERE staff_id = $1 AND int8range(rdv_timestamp, rdv_end) && int8range($2, $3)
+                ORDER BY rdv_timestamp
+            """, staff_id, ts, end)
+            if len(conflicts) >= RDV_STAFF_CAPACITY:
+                return None, conflicts[0]
+            # Voie prise par une réservation concurrente entre temps : on réessaie
+
+        return None, conflicts[0] if conflicts else None
 
 
-async def finalize_rdv(bot, channel, user, staff_member, day: str, hour: str, ts: int, messages_to_delete: list = None):
-    """Finalise et enregistre le RDV après confirmation du staff."""
+async def finalize_rdv(bot, channel, user, staff_member, day: str, hour: str, ts: int, messages_to_delete: list = None) -> bool:
+    """
+    Finalise et enregistre le RDV après confirmation du staff.
+    Retourne False si le créneau a été pris entre temps (rien n'est envoyé ni supprimé).
+    """
+
+    if bot.pool:
+        rdv, conflict = await book_rdv_slot(bot, user.id, staff_member.id, day, hour, ts, channel.id)
+        if rdv is None:
+            print(f"[RDV] {staff_member} complet sur le créneau {ts} (RDV #{conflict['id'] if conflict else '?'})")
+            if conflict:
+                bot.slots.add(dict(conflict))
+            return False
+
+        bot.slots.add(rdv)
 
     if messages_to_delete:
         for msg in messages_to_delete:
@@ -556,14 +849,6 @@ async def finalize_rdv(bot, channel, user, staff_member, day: str, hour: str, ts
                 await msg.delete()
             except:
                 pass
-    
-
-    if bot.pool:
-        async with bot.pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO rdv_planning (user_id, staff_id, day, hour, rdv_timestamp, channel_id)
-                VALUES ($1, $2, $3, $4, $5, $6)
-            """, user.id, staff_member.id, day, hour, ts, channel.id)
 
     await update_planning_embed(bot)
     
@@ -584,6 +869,12 @@ async def finalize_rdv(bot, channel, user, staff_member, day: str, hour: str, ts
 
     guild = channel.guild
     owner = guild.owner
+    if owner is None:
+        # Propriétaire absent du cache des membres (LEAN_MEMORY_MODE)
+        try:
+            owner = await guild.fetch_member(guild.owner_id)
+        except discord.HTTPException:
+            owner = None
     if owner:
         try:
             owner_embed = discord.Embed(color=EMBED_COLOR)
@@ -598,6 +889,65 @@ async def finalize_rdv(bot, channel, user, staff_member, day: str, hour: str, ts
         except:
             pass
 
+    return True
+
+
+async def build_availability(bot, staff_id: int) -> dict[str, list[str]]:
+    """Heures libres de chaque jour proposé, selon les RDV réservés et les absences du staff."""
+    rows = []
+    today = datetime.date.today()
+    if bot.absences.loaded:
+        rows = bot.absences.between(today, today + datetime.timedelta(days=8), staff_id=staff_id)
+    elif bot.pool:
+        async with bot.pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT start_date, end_date FROM staff_absences WHERE staff_id = $1 AND period && daterange($2, $3, '[]')",
+                staff_id, today, today + datetime.timedelta(days=8)
+            )
+    absences = [(r["start_date"], r["end_date"]) for r in rows]
+
+    grid = {}
+    for option in get_day_options():
+        hours = []
+        for hour in RDV_HOURS:
+            ts = get_next_rdv_timestamp(option.value, hour)
+            day = datetime.date.fromtimestamp(ts)
+            if any(start <= day <= end for start, end in absences):
+                continue
+            if await check_slot_available(bot, ts, staff_id):
+                hours.append(hour)
+        grid[option.value] = hours
+    return grid
+
+
+async def get_availability(bot, staff_id: int) -> dict[str, list[str]]:
+    """Grille des créneaux libres d'un membre du staff (en cache)."""
+    return await bot.availability.get(staff_id, lambda sid: build_availability(bot, sid))
+
+
+def apply_availability(day_select: discord.ui.Select, hour_select: discord.ui.Select, grid: dict, selected_day: str = None):
+    """Ne propose que les jours et heures libres de la grille."""
+    day_options = [opt for opt in get_day_options() if grid.get(opt.value)]
+    for opt in day_options:
+        opt.default = opt.value == selected_day
+
+    if day_options:
+        day_select.options = day_options
+        day_select.disabled = False
+    else:
+        day_select.options = [discord.SelectOption(label="Aucun créneau libre cette semaine", value="none")]
+        day_select.disabled = True
+
+    hours = grid.get(selected_day) if selected_day else None
+    if hours:
+        hour_select.options = [discord.SelectOption(label=h, value=h) for h in hours]
+        hour_select.placeholder = "Heure"
+        hour_select.disabled = False
+    else:
+        hour_select.options = [discord.SelectOption(label="—", value="none")]
+        hour_select.placeholder = "Choisissez d'abord un jour" if not selected_day else "Plus de créneau libre ce jour"
+        hour_select.disabled = True
+
 
 class StaffRDVConfirmView(discord.ui.View):
     """Vue envoyée en MP au staff pour confirmer ou refuser un RDV."""
@@ -618,7 +968,7 @@ class StaffRDVConfirmView(discord.ui.View):
         self.staff_member = interaction.user
         
     
-        if not await check_slot_available(self.bot, self.ts):
+        if not await check_slot_available(self.bot, self.ts, self.staff_member.id):
             return await interaction.response.send_message(
                 "❌ Ce créneau a été pris entre temps. Veuillez proposer un autre horaire.",
                 ephemeral=True
@@ -628,7 +978,11 @@ class StaffRDVConfirmView(discord.ui.View):
         messages_to_delete = [self.wait_message] if self.wait_message else []
         
 
-        await finalize_rdv(self.bot, self.channel, self.user, self.staff_member, self.day, self.hour, self.ts, messages_to_delete)
+        if not await finalize_rdv(self.bot, self.channel, self.user, self.staff_member, self.day, self.hour, self.ts, messages_to_delete):
+            return await interaction.response.send_message(
+                "❌ Ce créneau a été pris entre temps. Veuillez proposer un autre horaire.",
+                ephemeral=True
+            )
         
  
         date_formatted = format_date_french(self.day, self.hour)
@@ -671,9 +1025,10 @@ class StaffRDVConfirmView(discord.ui.View):
         counter_embed.set_author(name="Contre-proposition", icon_url=LOGO_URL)
         counter_embed.description = "Sélectionnez un nouveau créneau à proposer."
         
+        grid = await get_availability(self.bot, interaction.user.id)
         await interaction.followup.send(
             embed=counter_embed,
-            view=StaffCounterProposalView(self.bot, self.user, self.channel, interaction.user)
+            view=StaffCounterProposalView(self.bot, self.user, self.channel, interaction.user, grid)
         )
         self.stop()
 
@@ -682,7 +1037,7 @@ class StaffRDVConfirmView(discord.ui.View):
 class StaffCounterProposalView(discord.ui.View):
     """Vue pour que le staff fasse une contre-proposition."""
     
-    def __init__(self, bot, user, channel, staff_member):
+    def __init__(self, bot, user, channel, staff_member, grid: dict):
         super().__init__(timeout=1800)  
         self.bot = bot
         self.user = user
@@ -692,31 +1047,23 @@ class StaffCounterProposalView(discord.ui.View):
         self.selected_hour = None
         
 
-        day_select = discord.ui.Select(
-            placeholder="Jour",
-            options=get_day_options()
-        )
-        day_select.callback = self.select_day_callback
-        self.add_item(day_select)
+        self.day_select = discord.ui.Select(placeholder="Jour", row=0)
+        self.day_select.callback = self.select_day_callback
+        self.add_item(self.day_select)
         
    
-        hour_select = discord.ui.Select(
-            placeholder="Heure",
-            options=[
-                discord.SelectOption(label="17h00", value="17h00"),
-                discord.SelectOption(label="18h00", value="18h00"),
-                discord.SelectOption(label="19h00", value="19h00"),
-                discord.SelectOption(label="20h00", value="20h00"),
-                discord.SelectOption(label="21h00", value="21h00"),
-                discord.SelectOption(label="22h00", value="22h00"),
-            ]
-        )
-        hour_select.callback = self.select_hour_callback
-        self.add_item(hour_select)
+        self.hour_select = discord.ui.Select(placeholder="Heure", row=1)
+        self.hour_select.callback = self.select_hour_callback
+        self.add_item(self.hour_select)
+
+        apply_availability(self.day_select, self.hour_select, grid)
     
     async def select_day_callback(self, interaction: discord.Interaction):
         self.selected_day = interaction.data["values"][0]
-        await interaction.response.defer()
+        self.selected_hour = None
+        grid = await get_availability(self.bot, self.staff_member.id)
+        apply_availability(self.day_select, self.hour_select, grid, self.selected_day)
+        await interaction.response.edit_message(view=self)
     
     async def select_hour_callback(self, interaction: discord.Interaction):
         self.selected_hour = interaction.data["values"][0]
@@ -730,7 +1077,7 @@ class StaffCounterProposalView(discord.ui.View):
         ts = get_next_rdv_timestamp(self.selected_day, self.selected_hour)
         
 
-        if not await check_slot_available(self.bot, ts):
+        if not await check_slot_available(self.bot, ts, self.staff_member.id):
             return await interaction.response.send_message("❌ Ce créneau est déjà pris.", ephemeral=True)
         
 
@@ -781,7 +1128,7 @@ class UserRDVResponseView(discord.ui.View):
             return await interaction.response.send_message("❌ Seul le demandeur peut répondre.", ephemeral=True)
         
 
-        if not await check_slot_available(self.bot, self.ts):
+        if not await check_slot_available(self.bot, self.ts, self.staff_member.id):
             return await interaction.response.send_message("❌ Ce créneau a été pris entre temps.", ephemeral=True)
         
 
@@ -794,7 +1141,8 @@ class UserRDVResponseView(discord.ui.View):
         await interaction.response.defer()
         
 
-        await finalize_rdv(self.bot, self.channel, self.user, self.staff_member, self.day, self.hour, self.ts, messages_to_delete)
+        if not await finalize_rdv(self.bot, self.channel, self.user, self.staff_member, self.day, self.hour, self.ts, messages_to_delete):
+            return await interaction.followup.send("❌ Ce créneau a été pris entre temps.", ephemeral=True)
         self.stop()
 
     @discord.ui.button(label="Autre créneau", style=discord.ButtonStyle.secondary, custom_id="user_rdv_counter")
@@ -815,9 +1163,10 @@ class UserRDVResponseView(discord.ui.View):
         embed.set_author(name="Choisissez un créneau", icon_url=LOGO_URL)
         embed.description = "Sélectionnez vos disponibilités :"
         
+        grid = await get_availability(self.bot, self.staff_member.id)
         await interaction.channel.send(
             embed=embed,
-            view=RDVSelectorView(self.bot, self.staff_member, proposal_message=None)
+            view=RDVSelectorView(self.bot, self.staff_member, grid, proposal_message=None)
         )
         self.stop()
 
@@ -825,7 +1174,7 @@ class UserRDVResponseView(discord.ui.View):
 class RDVSelectorView(discord.ui.View):
     """Vue permettant au membre de choisir son créneau."""
     
-    def __init__(self, bot, staff_member, proposal_message=None):
+    def __init__(self, bot, staff_member, grid: dict, proposal_message=None):
         super().__init__(timeout=None)
         self.bot = bot
         self.staff_member = staff_member
@@ -834,33 +1183,23 @@ class RDVSelectorView(discord.ui.View):
         self.selected_hour = None
         
   
-        day_select = discord.ui.Select(
-            placeholder="Jour",
-            options=get_day_options(),
-            custom_id="rdv_day_select"
-        )
-        day_select.callback = self.select_day_callback
-        self.add_item(day_select)
-        
-
-        hour_select = discord.ui.Select(
-            placeholder="Heure",
-            options=[
-                discord.SelectOption(label="17h00", value="17h00"),
-                discord.SelectOption(label="18h00", value="18h00"),
-                discord.SelectOption(label="19h00", value="19h00"),
-                discord.SelectOption(label="20h00", value="20h00"),
-                discord.SelectOption(label="21h00", value="21h00"),
-                discord.SelectOption(label="22h00", value="22h00"),
-            ],
-            custom_id="rdv_hour_select"
-        )
-        hour_select.callback = self.select_hour_callback
-        self.add_item(hour_select)
+        self.day_select = discord.ui.Select(placeholder="Jour", custom_id="rdv_day_select", row=0)
+        self.day_select.callback = self.select_day_callback
+        self.add_item(self.day_select)
+        
+
+        self.hour_select = discord.ui.Select(placeholder="Heure", custom_id="rdv_hour_select", row=1)
+        self.hour_select.callback = self.select_hour_callback
+        self.add_item(self.hour_select)
+
+        apply_availability(self.day_select, self.hour_select, grid)
     
     async def select_day_callback(self, interaction: discord.Interaction):
         self.selected_day = interaction.data["values"][0]
-        await interaction.response.defer()
+        self.selected_hour = None
+        grid = await get_availability(self.bot, self.staff_member.id)
+        apply_availability(self.day_select, self.hour_select, grid, self.selected_day)
+        await interaction.response.edit_message(view=self)
     
     async def select_hour_callback(self, interaction: discord.Interaction):
         self.selected_hour = interaction.data["values"][0]
@@ -874,7 +1213,7 @@ class RDVSelectorView(discord.ui.View):
         ts = get_next_rdv_timestamp(self.selected_day, self.selected_hour)
 
 
-        if not await check_slot_available(self.bot, ts):
+        if not await check_slot_available(self.bot, ts, self.staff_member.id):
             date_formatted = format_date_french(self.selected_day, self.selected_hour)
             return await interaction.response.send_message(
                 f"❌ **Créneau indisponible**\n{date_formatted} est déjà pris.",
@@ -928,7 +1267,15 @@ class RDVSelectorView(discord.ui.View):
             )
         except discord.Forbidden:
 
-            await finalize_rdv(self.bot, interaction.channel, interaction.user, self.staff_member, self.selected_day, self.selected_hour, ts, [wait_message])
+            if not await finalize_rdv(self.bot, interaction.channel, interaction.user, self.staff_member, self.selected_day, self.selected_hour, ts, [wait_message]):
+                try:
+                    await wait_message.delete()
+                except:
+                    pass
+                await interaction.followup.send(
+                    f"❌ **Créneau indisponible**\n{date_formatted} a été pris entre temps.",
+                    ephemeral=True
+                )
 
 
 class AddMemberView(discord.ui.View):
@@ -1027,7 +1374,8 @@ class TicketManagementView(discord.ui.View):
         proposal_msg = await interaction.channel.send(embed=embed)
         
 
-        selector_view = RDVSelectorView(interaction.client, interaction.user, proposal_message=proposal_msg)
+        grid = await get_availability(interaction.client, interaction.user.id)
+        selector_view = RDVSelectorView(interaction.client, interaction.user, grid, proposal_message=proposal_msg)
         selector_msg = await interaction.channel.send(view=selector_view)
 
 
@@ -1045,24 +1393,93 @@ class CloseConfirmView(discord.ui.View):
     
     async def _close(self, interaction, transcript):
         await interaction.response.edit_message(content="Fermeture...", view=None)
-        
-        file = None
-        if transcript:
-            f = await generate_transcript(interaction.channel)
-            file = discord.File(f, filename=f"{interaction.channel.name}.txt")
-        
-        log_channel = interaction.guild.get_channel(CHANNELS["tickets_logs"])
-        if log_channel:
-            log_embed = discord.Embed(
-                title="Ticket fermé",
-                description=f"Salon: {interaction.channel.name}\nPar: {interaction.user.mention}",
-                color=EMBED_COLOR,
-                timestamp=datetime.datetime.now()
-            )
-            await log_channel.send(embed=log_embed, file=file if transcript else None)
-        
-        await interaction.channel.delete()
 
+        channel = interaction.channel
+        payload = {
+            "ticket_id": channel.id,
+            "channel_name": channel.name,
+            "owner_id": get_ticket_owner_id(channel),
+            "closed_by": interaction.user.id,
+            "transcript": transcript
+        }
+
+        cog = interaction.client.get_cog("TicketsCog")
+        jobs = interaction.client.jobs
+        if cog and jobs:
+            # Aussi sans transcript : rien ne doit être écrit pour ce ticket après son nettoyage
+            await cog.flush_captured_messages()
+            if transcript:
+                since = await capture_started_at(interaction.client)
+                if since is None or channel.created_at < since:
+                    # Ticket ouvert avant la capture : on copie l'historique avant suppression
+                    # (les messages déjà capturés sont ignorés par ON CONFLICT)
+                    await cog.backfill_ticket(channel)
+            await jobs.enqueue("ticket_close", payload)
+        elif cog:
+            try:
+                await cog.process_ticket_close(payload, iter_history_records(channel))
+            except Exception as e:
+                print(f"[TICKETS] Erreur fermeture {channel.name}: {e}")
+
+        await channel.delete()
+
+
+async def search_ticket_logs(bot, query: str, after: tuple | None = None, limit: int = SEARCH_PAGE_SIZE) -> list:
+    """
+    Recherche plein texte dans les transcripts archivés, triée par pertinence.
+    Pagination par curseur : after = (rank, ticket_id) du dernier résultat affiché.
+    """
+    async with bot.pool.acquire() as conn:
+        return await conn.fetch("""
+            SELECT * FROM (
+                SELECT ticket_id, channel_name, user_id, closed_at,
+                       ts_rank(search_vector, query) AS rank
+                FROM ticket_logs, websearch_to_tsquery('french', $1) AS query
+                WHERE search_vector @@ query
+            ) results
+            WHERE $2::real IS NULL OR (rank, ticket_id) < ($2::real, $3::bigint)
+            ORDER BY rank DESC, ticket_id DESC
+            LIMIT $4
+        """, query, after[0] if after else None, after[1] if after else None, limit)
+
+
+class TicketSearchView(discord.ui.View):
+    """Résultats de /ticket_search avec bouton page suivante."""
+
+    def __init__(self, bot, query: str, rows: list, page: int = 1):
+        super().__init__(timeout=300)
+        self.bot = bot
+        self.query = query
+        self.rows = rows
+        self.page = page
+        self.next_page.disabled = len(rows) < SEARCH_PAGE_SIZE
+
+    def build_embed(self) -> discord.Embed:
+        embed = discord.Embed(color=EMBED_COLOR)
+        embed.set_author(name=f"Recherche : {self.query[:200]}", icon_url=LOGO_URL)
+
+        if not self.rows:
+            embed.description = "Aucun ticket trouvé." if self.page == 1 else "Plus de résultats."
+        else:
+            lines = []
+            for row in self.rows:
+                closed = row["closed_at"].strftime('%d/%m/%Y') if row["closed_at"] else "?"
+                owner = f"<@{row['user_id']}>" if row["user_id"] else "Inconnu"
+                lines.append(f"**{row['channel_name'] or 'ticket'}** • {closed} • {owner}\n　`{row['ticket_id']}`")
+            embed.description = "\n".join(lines)
+
+        embed.set_footer(text=f"Page {self.page} • /transcript <id> pour ouvrir un ticket")
+        return embed
+
+    @discord.ui.button(label="Page suivante", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        # ts_rank note tous les résultats : la requête peut dépasser les 3s de Discord
+        await interaction.response.defer()
+        last = self.rows[-1]
+        rows = await search_ticket_logs(self.bot, self.query, (last["rank"], last["ticket_id"]))
+        view = TicketSearchView(self.bot, self.query, rows, self.page + 1)
+        await interaction.edit_original_response(embed=view.build_embed(), view=view)
+        self.stop()
 
 
 class TicketPanelView(discord.ui.View):
@@ -1084,7 +1501,10 @@ class TicketPanelView(discord.ui.View):
         
         if ticket_type == "reprise":
             cog = interaction.client.get_cog("TicketsCog")
-            projects = await cog.get_reprise_projects() if cog else DEFAULT_REPRISE_PROJECTS
+            if cog:
+                projects, options = await cog.get_reprise_catalog()
+            else:
+                projects, options = DEFAULT_REPRISE_PROJECTS, None
             
             if not projects:
                 return await interaction.response.send_message("Aucun projet disponible à la reprise.", ephemeral=True)
@@ -1092,7 +1512,7 @@ class TicketPanelView(discord.ui.View):
 
             await interaction.response.send_message(
                 "**Sélectionnez le projet que vous souhaitez reprendre :**",
-                view=RepriseSelectFallback(projects),
+                view=RepriseSelectFallback(projects, options),
                 ephemeral=True
             )
         else:
@@ -1134,21 +1554,25 @@ class RepriseModalFallback(discord.ui.Modal):
             self.children[2].value
         )
 
+def reprise_select_options(projects: list) -> list[discord.SelectOption]:
+    """Options du menu des reprises (prioritaires marquées ⚡)."""
+    options = []
+    for project in projects[:25]:
+        label = project["name"]
+        if project["priority"]: label += " ⚡"
+        options.append(discord.SelectOption(label=label, value=project["name"]))
+    return options
+
+
 class RepriseSelectFallback(discord.ui.View):
     """Menu déroulant initial pour choisir le projet."""
-    def __init__(self, projects: list):
+    def __init__(self, projects: list, options: list = None):
         super().__init__(timeout=120)
         self.projects = projects
         
-        options = []
-        for project in projects:
-            label = project["name"]
-            if project["priority"]: label += " ⚡"
-            options.append(discord.SelectOption(label=label, value=project["name"]))
-        
         select = discord.ui.Select(
             placeholder="Choisissez le projet",
-            options=options,
+            options=list(options or reprise_select_options(projects)),
             custom_id="reprise_fallback_select"
         )
         select.callback = self.select_callback
@@ -1166,34 +1590,313 @@ class TicketsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+        # Capture des messages de tickets, écrite par lots dans ticket_messages
+        self._captured = {}
+        self._captured_updates = []
+        self._flush_lock = asyncio.Lock()
+
+        # Rendu HTML des transcripts hors de la boucle asyncio
+        self.render_pool = None
+
+        # Copie locale des pièces jointes (les liens CDN Discord expirent)
+        self.archiver = None
+
+        # Projets de reprise + options du menu, rechargés après /reprise_add et /reprise_remove
+        self._reprise_catalog = None
+
+        # Autocomplétion sans requête : projets de reprise et tickets archivés
+        self.reprise_index = PrefixIndex()
+        self.ticket_index = PrefixIndex()
+
     async def cog_load(self):
+        self.flush_captured_loop.start()
+        self.maintain_ticket_logs.start()
+        if self.bot.jobs:
+            self.bot.jobs.register("ticket_close", self.process_ticket_close)
+        self.render_pool = ProcessPoolExecutor(
+            max_workers=TRANSCRIPT_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        if ATTACHMENTS_DIR:
+            self.archiver = AttachmentArchiver(ATTACHMENTS_DIR, ATTACHMENTS_CONCURRENCY, ATTACHMENTS_MAX_BYTES)
+            await self.archiver.start()
 
         self.bot.add_view(TicketPanelView())
         self.bot.add_view(TicketManagementView())
         self.bot.add_view(CloseConfirmView())
         self.bot.add_view(PlanningManagementView(self.bot))
-        
 
+
+        if self.bot.notify:
+            self.bot.notify.subscribe("reprise_projects", self.on_reprise_changed)
+        self.bot.startup.register("reprise_catalog", self.seed_reprise_projects, needs=("db",))
+        self.bot.startup.register("ticket_index", self.load_ticket_index, needs=("db",))
+        self.bot.startup.register("slot_index", self.load_slot_index, needs=("db",))
+        self.bot.startup.register("planning_panel", lambda: update_planning_embed(self.bot), needs=("db", "ready"))
+
+        # Extension rechargée (/sync_commands) : les tâches de démarrage ne sont pas
+        # relancées, les index de ce nouveau cog sont donc remplis ici
+        if self.bot.startup.reached("db"):
+            await self.refresh_reprise_catalog()
+            await self.load_ticket_index()
+
+    async def load_ticket_index(self):
+        """Charge les tickets archivés (nom du salon et ID) pour l'autocomplétion de /transcript."""
+        async with self.bot.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT ticket_id, channel_name FROM ticket_logs")
+        self.ticket_index.rebuild(ticket_index_entry(row["ticket_id"], row["channel_name"]) for row in rows)
+        print(f"[TICKETS] {len(rows)} ticket(s) archivé(s) indexé(s)")
+
+    async def load_slot_index(self):
+        await self.bot.slots.load(self.bot.pool, int(datetime.datetime.now().timestamp()) - 7200)
+
+    async def seed_reprise_projects(self):
+        async with self.bot.pool.acquire() as conn:
+            count = await conn.fetchval("SELECT COUNT(*) FROM reprise_projects")
+            if count == 0:
+                for project in DEFAULT_REPRISE_PROJECTS:
+                    await conn.execute(
+                        "INSERT INTO reprise_projects (name, priority) VALUES ($1, $2)",
+                        project["name"], project["priority"]
+                    )
+        await self.refresh_reprise_catalog()
+
+    async def cog_unload(self):
+        self.flush_captured_loop.cancel()
+        self.maintain_ticket_logs.cancel()
+        await self.flush_captured_messages()
+        if self.render_pool:
+            self.render_pool.shutdown(wait=False, cancel_futures=True)
+        if self.archiver:
+            await self.archiver.close()
+
+    async def process_ticket_close(self, payload: dict, records=None):
+        """Tâche de fond : transcript, sauvegarde BDD et log de fermeture."""
+        log_channel = self.bot.get_channel(CHANNELS["tickets_logs"])
+        if log_channel is None:
+            # Exception : la tâche est réessayée plus tard au lieu d'être supprimée sans log
+            raise RuntimeError(f"salon des logs introuvable ({CHANNELS['tickets_logs']})")
+
+        file = None
+        too_large = False
+        if payload["transcript"]:
+            if records is None:
+                records = iter_captured_records(self.bot, payload["ticket_id"])
+            search = SearchTextCollector()
+            f = await generate_transcript(payload["channel_name"], records, render_pool=self.render_pool, on_record=search)
+            data, codec = await asyncio.to_thread(compress_transcript, f)
+            await save_transcript(
+                self.bot, payload["ticket_id"], payload["channel_name"],
+                payload["owner_id"], payload["closed_by"], data, codec, TRANSCRIPT_FORMAT, search.text()
+            )
+            self.ticket_index.add(*ticket_index_entry(payload["ticket_id"], payload["channel_name"]))
+            file = transcript_upload(
+                f, transcript_filename(payload["channel_name"]), log_channel.guild.filesize_limit,
+                data if codec == "gzip" else None
+            )
+            too_large = file is None
+
+        log_embed = discord.Embed(
+            title="Ticket fermé",
+            description=f"Salon: {payload['channel_name']}\nPar: <@{payload['closed_by']}>",
+            color=EMBED_COLOR,
+            timestamp=datetime.datetime.now()
+        )
+        if payload["transcript"] and too_large:
+            # Une erreur 413 ferait échouer la tâche à chaque essai : le transcript reste en BDD
+            log_embed.description += f"\n\nTranscript trop volumineux pour Discord : `/transcript {payload['ticket_id']}`"
+        await log_channel.send(embed=log_embed, file=file)
+
+        # Transcript archivé (compressé) et log envoyé : les messages bruts ne servent plus
         if self.bot.pool:
             async with self.bot.pool.acquire() as conn:
-                count = await conn.fetchval("SELECT COUNT(*) FROM reprise_projects")
-                if count == 0:
-                    for project in DEFAULT_REPRISE_PROJECTS:
-                        await conn.execute(
-                            "INSERT INTO reprise_projects (name, priority) VALUES ($1, $2)",
-                            project["name"], project["priority"]
-                        )
-        
+                await conn.execute("DELETE FROM ticket_messages WHERE ticket_id = $1", payload["ticket_id"])
+
+    async def backfill_ticket(self, channel: discord.TextChannel):
+        """Copie l'historique Discord d'un ticket dans ticket_messages."""
+        batch = []
+        async for record in iter_history_records(channel):
+            batch.append(record)
+            if len(batch) >= CAPTURE_FLUSH_BATCH:
+                await self._insert_records(batch)
+                batch = []
+        if batch:
+            await self._insert_records(batch)
+
+    async def _insert_records(self, records: list, conn=None):
+        if conn is None:
+            async with self.bot.pool.acquire() as conn:
+                return await self._insert_records(records, conn)
+
+        await conn.executemany("""
+            INSERT INTO ticket_messages
+                (message_id, ticket_id, author_id, author_name, content, original_content,
+                 attachments, attachment_hashes, embeds, reply_to, is_staff, created_at, edited_at, deleted)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+            ON CONFLICT (message_id) DO NOTHING
+        """, [(
+            r["message_id"], r["ticket_id"], r["author_id"], r["author_name"], r["content"],
+            r["original_content"], r["attachments"], r["attachment_hashes"], json.dumps(r["embeds"]),
+            r["reply_to"], r["is_staff"], r["created_at"], r["edited_at"], r["deleted"]
+        ) for r in records])
+
+    def _is_ticket_channel(self, channel) -> bool:
+        return getattr(channel, "category_id", None) == CHANNELS["tickets_category"]
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if not self.bot.pool or not self._is_ticket_channel(message.channel):
+            return
 
-        await update_planning_embed(self.bot)
+        record = message_to_record(message)
+        self._captured[message.id] = record
+
+        if len(self._captured) >= CAPTURE_FLUSH_BATCH:
+            await self.flush_captured_messages()
 
-    async def get_reprise_projects(self) -> list:
+        if record["attachments"] and self.archiver:
+            hashes = await self.archiver.archive_many(record["attachments"])
+            pending = self._captured.get(message.id)
+            if pending is not None:
+                pending["attachment_hashes"] = hashes
+            else:
+                self._captured_updates.append(("hashes", message.id, hashes, None))
+
+    # Événements bruts : la capture ne dépend pas du cache de messages de discord.py
+    # (limité, voire désactivé avec LEAN_MEMORY_MODE)
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        after = payload.message
+        if not self.bot.pool or not self._is_ticket_channel(after.channel):
+            return
+        # Pas d'edited_at : mise à jour faite par Discord (aperçu de lien...), pas une édition
+        if after.edited_at is None:
+            return
+        if payload.cached_message and payload.cached_message.content == after.content:
+            return
+
+        edited_at = after.edited_at
+        pending = self._captured.get(after.id)
+        if pending:
+            if pending["content"] == after.content:
+                return
+            if pending["original_content"] is None:
+                pending["original_content"] = pending["content"]
+            pending["content"] = after.content
+            pending["edited_at"] = edited_at
+        else:
+            self._captured_updates.append(("edit", after.id, after.content, edited_at))
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if not self.bot.pool or not self._is_ticket_channel(self.bot.get_channel(payload.channel_id)):
+            return
+
+        pending = self._captured.get(payload.message_id)
+        if pending:
+            pending["deleted"] = True
+        else:
+            self._captured_updates.append(("delete", payload.message_id, None, None))
+
+    async def flush_captured_messages(self):
+        """Écrit en BDD les messages capturés en attente."""
         if not self.bot.pool:
-            return DEFAULT_REPRISE_PROJECTS
-        
-        async with self.bot.pool.acquire() as conn:
-            rows = await conn.fetch("SELECT name, priority FROM reprise_projects ORDER BY priority DESC, name ASC")
-            return [{"name": row["name"], "priority": row["priority"]} for row in rows]
+            return
+
+        async with self._flush_lock:
+            if not self._captured and not self._captured_updates:
+                return
+
+            records, self._captured = list(self._captured.values()), {}
+            updates, self._captured_updates = self._captured_updates, []
+
+            try:
+                async with self.bot.pool.acquire() as conn:
+                    async with conn.transaction():
+                        if records:
+                            await self._insert_records(records, conn)
+
+                        edits = [(mid, content, ts) for kind, mid, content, ts in updates if kind == "edit"]
+                        if edits:
+                            await conn.executemany("""
+                                UPDATE ticket_messages
+                                SET original_content = COALESCE(original_content, content),
+                                    content = $2, edited_at = $3
+                                WHERE message_id = $1
+                            """, edits)
+
+                        hashes = [(mid, value) for kind, mid, value, _ in updates if kind == "hashes"]
+                        if hashes:
+                            await conn.executemany(
+                                "UPDATE ticket_messages SET attachment_hashes = $2 WHERE message_id = $1",
+                                hashes
+                            )
+
+                        deletes = [(mid,) for kind, mid, _, _ in updates if kind == "delete"]
+                        if deletes:
+                            await conn.executemany(
+                                "UPDATE ticket_messages SET deleted = TRUE WHERE message_id = $1",
+                                deletes
+                            )
+            except Exception as e:
+                print(f"[TICKETS] Erreur écriture des messages capturés: {e}")
+                # On remet en file pour le prochain passage
+                for r in records:
+                    self._captured.setdefault(r["message_id"], r)
+                self._captured_updates[:0] = updates
+
+    @tasks.loop(hours=24)
+    async def maintain_ticket_logs(self):
+        """Prépare les partitions à venir et purge les logs trop anciens."""
+        if not self.bot.pool:
+            return
+        today = datetime.date.today()
+
+        # Étapes indépendantes : un échec sur les partitions ne bloque pas la purge
+        try:
+            async with self.bot.pool.acquire() as conn:
+                if await is_partitioned(conn):
+                    await ensure_log_partitions(conn, today)
+        except Exception as e:
+            print(f"[LOGS] Erreur création des partitions ticket_logs: {e}")
+
+        if not LOGS_RETENTION_DAYS:
+            return
+        cutoff = today - datetime.timedelta(days=LOGS_RETENTION_DAYS)
+        try:
+            if await purge_ticket_logs(self.bot.pool, cutoff):
+                await self.load_ticket_index()
+        except Exception as e:
+            print(f"[LOGS] Erreur purge ticket_logs: {e}")
+        try:
+            await purge_ticket_messages(self.bot.pool, cutoff)
+        except Exception as e:
+            print(f"[LOGS] Erreur purge ticket_messages: {e}")
+
+    @tasks.loop(seconds=CAPTURE_FLUSH_INTERVAL)
+    async def flush_captured_loop(self):
+        await self.flush_captured_messages()
+
+    async def refresh_reprise_catalog(self):
+        """Recharge la liste des projets de reprise et ses options de menu."""
+        if not self.bot.pool:
+            projects = DEFAULT_REPRISE_PROJECTS
+        else:
+            async with self.bot.pool.acquire() as conn:
+                rows = await conn.fetch("SELECT name, priority FROM reprise_projects ORDER BY priority DESC, name ASC")
+            projects = [{"name": row["name"], "priority": row["priority"]} for row in rows]
+        self._reprise_catalog = (projects, reprise_select_options(projects))
+        self.reprise_index.rebuild((p["name"], p["name"]) for p in projects)
+
+    async def on_reprise_changed(self, event: dict):
+        """reprise_projects modifiée (autre instance, édition directe en base...)."""
+        await self.refresh_reprise_catalog()
+
+    async def get_reprise_catalog(self) -> tuple[list, list]:
+        """(projets, options du menu) en cache : aucune requête hors rechargement."""
+        if self._reprise_catalog is None:
+            await self.refresh_reprise_catalog()
+        return self._reprise_catalog
 
 
 
@@ -1207,6 +1910,133 @@ class TicketsCog(commands.Cog):
         await interaction.channel.send(embed=embed, view=TicketPanelView())
         await interaction.response.send_message("✅ Panneau installé.", ephemeral=True)
 
+    @app_commands.command(name="transcript", description="Récupérer le transcript d'un ticket fermé")
+    @app_commands.describe(ticket_id="ID du salon du ticket")
+    async def transcript(self, interaction: discord.Interaction, ticket_id: str):
+        staff_role = interaction.guild.get_role(ROLES["support"])
+        if staff_role not in interaction.user.roles:
+            return await interaction.response.send_message("❌ Réservé au staff.", ephemeral=True)
+
+        if not self.bot.pool:
+            return await interaction.response.send_message("❌ BDD indisponible.", ephemeral=True)
+
+        try:
+            ticket_id = int(ticket_id)
+        except ValueError:
+            return await interaction.response.send_message("❌ ID de ticket invalide.", ephemeral=True)
+
+        await interaction.response.defer(ephemeral=True)
+
+        async with self.bot.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT channel_name, transcript_data, codec, format FROM ticket_logs WHERE ticket_id = $1",
+                ticket_id
+            )
+
+        if not row or row["transcript_data"] is None:
+            return await interaction.followup.send("❌ Aucun transcript pour ce ticket.", ephemeral=True)
+
+        f = await asyncio.to_thread(decompress_transcript, row["transcript_data"], row["codec"])
+        name = row["channel_name"] or str(ticket_id)
+        file = transcript_upload(
+            f, transcript_filename(name, row["format"] or "txt", compress=False), interaction.guild.filesize_limit,
+            row["transcript_data"] if row["codec"] == "gzip" else None
+        )
+        if file is None:
+            return await interaction.followup.send("❌ Transcript trop volumineux pour être envoyé sur Discord.", ephemeral=True)
+
+        await interaction.followup.send(f"📄 Transcript de **{name}**", file=file, ephemeral=True)
+
+    @transcript.autocomplete("ticket_id")
+    async def transcript_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        staff_role = interaction.guild.get_role(ROLES["support"])
+        if staff_role not in interaction.user.roles:
+            return []
+        return [app_commands.Choice(name=label, value=value) for label, value in self.ticket_index.search(current)]
+
+    @app_commands.command(name="piece_jointe", description="Récupérer une pièce jointe archivée")
+    @app_commands.describe(empreinte="Empreinte sha256 indiquée dans le transcript")
+    async def piece_jointe(self, interaction: discord.Interaction, empreinte: str):
+        staff_role = interaction.guild.get_role(ROLES["support"])
+        if staff_role not in interaction.user.roles:
+            return await interaction.response.send_message("❌ Réservé au staff.", ephemeral=True)
+
+        empreinte = empreinte.strip().lower().removeprefix("sha256:")
+        if not self.archiver or not is_digest(empreinte) or not self.archiver.exists(empreinte):
+            return await interaction.response.send_message("❌ Pièce jointe introuvable.", ephemeral=True)
+
+        # ATTACHMENTS_MAX_BYTES peut dépasser la limite d'upload du bot
+        path = self.archiver.path_for(empreinte)
+        if os.path.getsize(path) > interaction.guild.filesize_limit:
+            return await interaction.response.send_message(
+                "❌ Pièce jointe trop volumineuse pour être envoyée sur Discord.", ephemeral=True
+            )
+
+        await interaction.response.send_message(
+            file=discord.File(path, filename=empreinte),
+            ephemeral=True
+        )
+
+    @app_commands.command(name="jobs_status", description="État de la file des tâches de fond")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def jobs_status(self, interaction: discord.Interaction):
+        if not self.bot.jobs:
+            return await interaction.response.send_message("❌ BDD indisponible.", ephemeral=True)
+
+        rows = await self.bot.jobs.stats()
+        embed = discord.Embed(color=EMBED_COLOR)
+        embed.set_author(name="Tâches de fond", icon_url=LOGO_URL)
+
+        if not rows:
+            embed.description = "✅ Aucune tâche en attente."
+        else:
+            lines = []
+            for row in rows:
+                age = row["oldest_age"] or 0
+                lines.append(f"`{row['kind']}` • **{row['status']}** : {row['count']} (plus ancienne : {age // 60}min {age % 60}s)")
+            embed.description = "\n".join(lines)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="ticket_search", description="Rechercher dans les transcripts archivés")
+    @app_commands.describe(recherche="Mots-clés (ex: \"Jean Dupont\" plainte -remboursement)")
+    async def ticket_search(self, interaction: discord.Interaction, recherche: str):
+        staff_role = interaction.guild.get_role(ROLES["support"])
+        if staff_role not in interaction.user.roles:
+            return await interaction.response.send_message("❌ Réservé au staff.", ephemeral=True)
+
+        if not self.bot.pool:
+            return await interaction.response.send_message("❌ BDD indisponible.", ephemeral=True)
+
+        await interaction.response.defer(ephemeral=True)
+        rows = await search_ticket_logs(self.bot, recherche)
+        view = TicketSearchView(self.bot, recherche, rows)
+        await interaction.followup.send(embed=view.build_embed(), view=view, ephemeral=True)
+
+    @app_commands.command(name="logs_stats", description="Taille des logs de tickets en BDD")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def logs_stats(self, interaction: discord.Interaction):
+        if not self.bot.pool:
+            return await interaction.response.send_message("❌ BDD indisponible.", ephemeral=True)
+
+        async with self.bot.pool.acquire() as conn:
+            stats = await ticket_logs_stats(conn)
+
+        embed = discord.Embed(color=EMBED_COLOR)
+        embed.set_author(name="Logs des tickets", icon_url=LOGO_URL)
+
+        lines = []
+        for part in stats:
+            size_mb = part["size"] / (1024 * 1024)
+            lines.append(f"`{part['name']}` • {part['rows']} ticket(s) • {size_mb:.2f} Mo")
+        embed.description = "\n".join(lines) or "Aucune donnée."
+
+        total_mb = sum(p["size"] for p in stats) / (1024 * 1024)
+        retention = f"{LOGS_RETENTION_DAYS} jours" if LOGS_RETENTION_DAYS else "illimitée"
+        embed.set_footer(text=f"Total {total_mb:.2f} Mo • Conservation {retention}")
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(name="reprise_add", description="Ajouter un projet à la liste")
     @app_commands.checks.has_permissions(administrator=True)
     async def reprise_add(self, interaction: discord.Interaction, nom: str, prioritaire: bool = False):
@@ -1219,7 +2049,9 @@ class TicketsCog(commands.Cog):
                 tag = "⚡" if prioritaire else ""
                 await interaction.response.send_message(f"✅ Projet **{nom}** {tag} ajouté.", ephemeral=True)
             except:
-                await interaction.response.send_message(f"❌ Erreur : Le projet **{nom}** existe probablement déjà.", ephemeral=True)
+                return await interaction.response.send_message(f"❌ Erreur : Le projet **{nom}** existe probablement déjà.", ephemeral=True)
+
+        await self.refresh_reprise_catalog()
 
     @app_commands.command(name="reprise_remove", description="Retirer un projet de la liste")
     @app_commands.checks.has_permissions(administrator=True)
@@ -1232,7 +2064,13 @@ class TicketsCog(commands.Cog):
             if res == "DELETE 1":
                 await interaction.response.send_message(f"✅ Projet **{nom}** retiré.", ephemeral=True)
             else:
-                await interaction.response.send_message(f"❌ Projet **{nom}** introuvable.", ephemeral=True)
+                return await interaction.response.send_message(f"❌ Projet **{nom}** introuvable.", ephemeral=True)
+
+        await self.refresh_reprise_catalog()
+
+    @reprise_remove.autocomplete("nom")
+    async def reprise_remove_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return [app_commands.Choice(name=label, value=value) for label, value in self.reprise_index.search(current)]
 
     @app_commands.command(name="clear_rdv", description="Supprimer tous les rendez-vous du planning")
     @app_commands.checks.has_permissions(administrator=True)
@@ -1244,7 +2082,7 @@ class TicketsCog(commands.Cog):
             result = await conn.execute("DELETE FROM rdv_planning")
 
             count = int(result.split(" ")[1]) if result else 0
-        
+        self.bot.slots.clear()
 
         await update_planning_embed(self.bot)
         
@@ -1257,23 +2095,17 @@ class TicketsCog(commands.Cog):
         
         try:
 
-            self.bot.tree.clear_commands(guild=None)
-            await self.bot.tree.sync()  
-            
-
             extensions = list(self.bot.extensions.keys())
             for ext in extensions:
                 await self.bot.reload_extension(ext)
             
-
-            guild = interaction.guild
-            self.bot.tree.copy_global_to(guild=guild)
-            synced = await self.bot.tree.sync(guild=guild)
+            # Synchro forcée : ignore l'empreinte enregistrée, puis la met à jour
+            synced = await sync_command_tree(self.bot, interaction.guild, force=True)
             
             await interaction.followup.send(
                 f"✅ **Commandes nettoyées !**\n"
                 f"• Commandes globales supprimées\n"
-                f"• **{len(synced)}** commandes actives sur ce serveur",
+                f"• **{synced}** commandes actives sur ce serveur",
                 ephemeral=True
             )
         except Exception as e:
@@ -29,6 +29,29 @@ ROLES = {
 GUILD_ID = 1443995814765793405 #id du serveur IMPORTANT POUR SYNCHRO COMMANDES
 
 
+TRANSCRIPT_MAX_MEMORY = 1024 * 1024 #taille max (octets) gardée en RAM pour un transcript, au dela ca passe sur le disque
+TRANSCRIPT_GZIP = False #True = transcript compressé en .gz (plus léger pour les gros tickets)
+TRANSCRIPT_FORMAT = "html" #"html" (embeds, pièces jointes, réponses, staff en couleur) ou "txt" (texte brut)
+TRANSCRIPT_RENDER_WORKERS = 2 #nombre de processus pour générer les transcripts HTML
+
+
+ATTACHMENTS_DIR = "archives/attachments" #dossier ou les pieces jointes des tickets sont copiées (None = désactivé)
+ATTACHMENTS_BASE_URL = None #url publique du dossier si il est servi par un serveur web (liens dans les transcripts HTML)
+ATTACHMENTS_CONCURRENCY = 4 #téléchargements simultanés max
+ATTACHMENTS_MAX_BYTES = 25 * 1024 * 1024 #taille max d'une piece jointe archivée
+
+
+JOB_WORKERS = 2 #nombre de tâches de fond (transcripts, logs) traitées en parallèle
+LOGS_RETENTION_DAYS = 365 #durée de conservation des transcripts en BDD (None = pour toujours)
+
+
+RDV_SLOT_LENGTH = 30 #durée d'un entretien en minutes
+RDV_STAFF_CAPACITY = 1 #entretiens simultanés max par membre du staff
+
+
+LEAN_MEMORY_MODE = False #True = gros serveurs : les membres ne sont pas tous chargés au démarrage et aucun message n'est gardé en cache
+
+
 def create_embed(title: str, description: str = None, footer: str = None) -> discord.Embed:
     """Crée un embed avec le style Remember RolePlay."""
     embed = discord.Embed(
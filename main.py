@@ -1,27 +1,73 @@
 import os
+import sys
+import time
 import discord
 import asyncpg
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 
+from config import GUILD_ID, JOB_WORKERS, LEAN_MEMORY_MODE, RDV_SLOT_LENGTH, RDV_STAFF_CAPACITY
+from utils.jobs import JobQueue
+from utils.panels import PanelScheduler
+from utils.startup import StartupRunner
+from utils.slots import SlotIndex
+from utils.availability import AvailabilityCache
+from utils.intervals import AbsenceIndex
+from utils.notify import InvalidationBus
+from utils.names import NameResolver
+from utils.migrations import migrate
+from utils.command_sync import sync_command_tree
+
 load_dotenv()
 
 TOKEN = os.getenv("DISCORD_TOKEN")
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 
+def peak_memory_mb() -> float | None:
+    """Pic de mémoire résidente du processus (Mo), None si indisponible (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
 class RememberBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.members = True
         intents.message_content = True
 
+        options = {}
+        if LEAN_MEMORY_MODE:
+            # Les membres sont récupérés à la demande (NameResolver, notify_admins) au lieu
+            # d'être tous chargés au démarrage. La capture des tickets utilise les événements
+            # bruts et n'a pas besoin du cache de messages.
+            options = {
+                "chunk_guilds_at_startup": False,
+                "member_cache_flags": discord.MemberCacheFlags.none(),
+                "max_messages": None,
+            }
+
         super().__init__(
             command_prefix="!",
             intents=intents,
-            help_command=None
+            help_command=None,
+            **options
         )
+        self.started_at = time.monotonic()
         self.pool = None
+        self.jobs = None
+        self.notify = None
+        self.panels = PanelScheduler()
+        self.startup = StartupRunner()
+        self.slots = SlotIndex(RDV_SLOT_LENGTH * 60, RDV_STAFF_CAPACITY)
+        self.availability = AvailabilityCache(self.slots)
+        self.absences = AbsenceIndex()
+        self.names = NameResolver(self, GUILD_ID)
 
     async def setup_hook(self):
         if DATABASE_URL:
@@ -29,74 +75,13 @@ class RememberBot(commands.Bot):
                 self.pool = await asyncpg.create_pool(dsn=DATABASE_URL)
                 print("[DB] Connexion PostgreSQL établie.")
 
-                async with self.pool.acquire() as conn:
-                    
-                    await conn.execute("""
-                        CREATE TABLE IF NOT EXISTS ticket_logs (
-                            ticket_id BIGINT PRIMARY KEY,
-                            user_id BIGINT,
-                            transcript TEXT,
-                            closed_at TIMESTAMP DEFAULT NOW()
-                        );
-                    """)
-                    
-                    
-                    await conn.execute("""
-                        CREATE TABLE IF NOT EXISTS reprise_projects (
-                            id SERIAL PRIMARY KEY,
-                            name TEXT UNIQUE NOT NULL,
-                            priority BOOLEAN DEFAULT FALSE
-                        );
-                    """)
-
-                    
-                    await conn.execute("""
-                        CREATE TABLE IF NOT EXISTS rdv_planning (
-                            id SERIAL PRIMARY KEY,
-                            user_id BIGINT,
-                            staff_id BIGINT,
-                            day TEXT,
-                            hour TEXT,
-                            rdv_timestamp BIGINT, 
-                            channel_id BIGINT,
-                            created_at TIMESTAMP DEFAULT NOW()
-                        );
-                    """)
-                
-                    
-                    try:
-                        await conn.execute("ALTER TABLE rdv_planning ADD COLUMN IF NOT EXISTS rdv_timestamp BIGINT;")
-                    except Exception:
-                        pass 
-                    
-                    
-                    await conn.execute("""
-                        CREATE TABLE IF NOT EXISTS persistent_messages (
-                            key TEXT PRIMARY KEY,
-                            message_id BIGINT,
-                            channel_id BIGINT
-                        );
-                    """)
-                    
-                    
-                    await conn.execute("""
-                        CREATE TABLE IF NOT EXISTS staff_absences (
-                            id SERIAL PRIMARY KEY,
-                            staff_id BIGINT NOT NULL,
-                            start_date TEXT NOT NULL,
-                            end_date TEXT NOT NULL,
-                            reason TEXT,
-                            created_at TIMESTAMP DEFAULT NOW()
-                        );
-                    """)
-
-                    
-                    await conn.execute("""
-                        CREATE TABLE IF NOT EXISTS useful_links (
-                            label TEXT PRIMARY KEY,
-                            url TEXT NOT NULL
-                        );
-                    """)
+                version = await migrate(self.pool)
+                print(f"[DB] Schéma à jour (version {version}).")
+
+                await self.panels.load(self.pool)
+                self.jobs = JobQueue(self, workers=JOB_WORKERS)
+                self.notify = InvalidationBus(DATABASE_URL)
+                self.notify.subscribe("persistent_messages", self.panels.on_remote_change)
 
             except Exception as e:
                 print(f"[DB] Erreur : {e}")
@@ -115,26 +100,49 @@ class RememberBot(commands.Bot):
             except Exception as e:
                 print(f"[COG] Erreur {ext} : {e}")
 
-        
-        from config import GUILD_ID
+        # Les cogs ont enregistré leurs handlers : les workers attendent on_ready pour vider la file
+        if self.jobs:
+            await self.jobs.start()
+
+        # Les cogs se sont abonnés à leurs tables
+        if self.notify:
+            self.notify.start()
+
+        if self.pool:
+            await self.startup.reach("db")
+
         guild = discord.Object(id=GUILD_ID)
         
-        
-        self.tree.copy_global_to(guild=guild)
-        synced = await self.tree.sync(guild=guild)
-        print(f"[BOT] {len(synced)} commandes synchronisées sur le serveur.")
-        
-        
-        self.tree.clear_commands(guild=None)
-        await self.tree.sync()
+        # Pas d'appel à Discord si les commandes n'ont pas changé depuis la dernière synchro
+        try:
+            synced = await sync_command_tree(self, guild)
+            if synced is None:
+                print("[BOT] Commandes inchangées, synchronisation ignorée.")
+            else:
+                print(f"[BOT] {synced} commandes synchronisées sur le serveur.")
+        except Exception as e:
+            print(f"[BOT] Erreur synchronisation des commandes : {e}")
 
     async def close(self):
+        if self.jobs:
+            await self.jobs.stop()
+        if self.notify:
+            await self.notify.stop()
         if self.pool:
             await self.pool.close()
         await super().close()
 
     async def on_ready(self):
         print(f"[BOT] Connecté : {self.user} (ID: {self.user.id})")
+        if not self.startup.reached("ready"):
+            memory = peak_memory_mb()
+            print(
+                f"[BOT] Prêt en {time.monotonic() - self.started_at:.1f}s"
+                + (f", mémoire max {memory:.0f} Mo" if memory is not None else "")
+                + (" (mode mémoire réduite)" if LEAN_MEMORY_MODE else "")
+            )
+        # Sans effet lors des reconnexions : chaque tâche ne tourne qu'une fois
+        await self.startup.reach("ready")
         if not self.update_status.is_running():
             self.update_status.start()
 
@@ -0,0 +1,107 @@
+-- Schéma initial : reprend tout ce que setup_hook créait à chaque démarrage.
+-- Idempotent pour les bases déjà créées par les anciennes versions du bot.
+
+-- Partitionnée par mois pour purger les vieux logs sans verrouiller la table.
+-- Les installations existantes gardent leur table classique.
+CREATE TABLE IF NOT EXISTS ticket_logs (
+    ticket_id BIGINT NOT NULL,
+    user_id BIGINT,
+    transcript TEXT,
+    closed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (ticket_id, closed_at)
+) PARTITION BY RANGE (closed_at);
+
+ALTER TABLE ticket_logs
+    ADD COLUMN IF NOT EXISTS channel_name TEXT,
+    ADD COLUMN IF NOT EXISTS closed_by BIGINT,
+    ADD COLUMN IF NOT EXISTS transcript_data BYTEA,
+    ADD COLUMN IF NOT EXISTS codec TEXT,
+    ADD COLUMN IF NOT EXISTS format TEXT,
+    ADD COLUMN IF NOT EXISTS search_text TEXT;
+
+ALTER TABLE ticket_logs
+    ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('french', coalesce(channel_name, '') || ' ' || coalesce(search_text, ''))
+    ) STORED;
+CREATE INDEX IF NOT EXISTS ticket_logs_search_idx ON ticket_logs USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS ticket_logs_closed_at_idx ON ticket_logs USING BRIN (closed_at);
+
+-- Les partitions mensuelles sont créées par la boucle d'entretien des logs
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('ticket_logs')) = 'p' THEN
+        CREATE TABLE IF NOT EXISTS ticket_logs_default PARTITION OF ticket_logs DEFAULT;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS ticket_messages (
+    message_id BIGINT PRIMARY KEY,
+    ticket_id BIGINT NOT NULL,
+    author_id BIGINT,
+    author_name TEXT,
+    content TEXT,
+    original_content TEXT,
+    attachments TEXT[],
+    attachment_hashes TEXT[],
+    embeds JSONB,
+    reply_to BIGINT,
+    is_staff BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMPTZ,
+    edited_at TIMESTAMPTZ,
+    deleted BOOLEAN DEFAULT FALSE
+);
+CREATE INDEX IF NOT EXISTS ticket_messages_ticket_idx
+    ON ticket_messages (ticket_id, created_at);
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS background_jobs_pending_idx
+    ON background_jobs (run_after) WHERE status = 'pending';
+
+CREATE TABLE IF NOT EXISTS reprise_projects (
+    id SERIAL PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    priority BOOLEAN DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS rdv_planning (
+    id SERIAL PRIMARY KEY,
+    user_id BIGINT,
+    staff_id BIGINT,
+    day TEXT,
+    hour TEXT,
+    rdv_timestamp BIGINT,
+    channel_id BIGINT,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+ALTER TABLE rdv_planning ADD COLUMN IF NOT EXISTS rdv_timestamp BIGINT;
+
+CREATE TABLE IF NOT EXISTS persistent_messages (
+    key TEXT PRIMARY KEY,
+    message_id BIGINT,
+    channel_id BIGINT
+);
+ALTER TABLE persistent_messages ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE TABLE IF NOT EXISTS staff_absences (
+    id SERIAL PRIMARY KEY,
+    staff_id BIGINT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    reason TEXT,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS useful_links (
+    label TEXT PRIMARY KEY,
+    url TEXT NOT NULL
+);
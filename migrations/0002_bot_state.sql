@@ -0,0 +1,6 @@
+-- État interne du bot (empreinte des commandes synchronisées, etc.)
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
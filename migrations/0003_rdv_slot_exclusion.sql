@@ -0,0 +1,18 @@
+-- Un seul RDV par créneau de 30 minutes, garanti par la base.
+
+-- Les RDV sans horodatage ne peuvent pas être placés dans le planning
+DELETE FROM rdv_planning WHERE rdv_timestamp IS NULL;
+ALTER TABLE rdv_planning ALTER COLUMN rdv_timestamp SET NOT NULL;
+
+-- Doublons créés avant la contrainte : on garde le plus ancien
+DELETE FROM rdv_planning a
+USING rdv_planning b
+WHERE a.id > b.id
+  AND a.rdv_timestamp > b.rdv_timestamp - 1800
+  AND a.rdv_timestamp < b.rdv_timestamp + 1800;
+
+CREATE INDEX IF NOT EXISTS rdv_planning_ts_idx ON rdv_planning (rdv_timestamp);
+
+ALTER TABLE rdv_planning
+    ADD CONSTRAINT rdv_planning_no_overlap
+    EXCLUDE USING gist (int8range(rdv_timestamp, rdv_timestamp + 1800) WITH &&);
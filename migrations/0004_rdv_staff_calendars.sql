@@ -0,0 +1,16 @@
+-- Un calendrier par membre du staff : chacun peut mener RDV_STAFF_CAPACITY
+-- entretiens en parallèle (une "voie" par entretien simultané).
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE rdv_planning
+    ADD COLUMN IF NOT EXISTS rdv_end BIGINT,
+    ADD COLUMN IF NOT EXISTS lane SMALLINT NOT NULL DEFAULT 0;
+UPDATE rdv_planning SET rdv_end = rdv_timestamp + 1800 WHERE rdv_end IS NULL;
+ALTER TABLE rdv_planning ALTER COLUMN rdv_end SET NOT NULL;
+
+ALTER TABLE rdv_planning DROP CONSTRAINT IF EXISTS rdv_planning_no_overlap;
+ALTER TABLE rdv_planning
+    ADD CONSTRAINT rdv_planning_staff_no_overlap
+    EXCLUDE USING gist (staff_id WITH =, lane WITH =, int8range(rdv_timestamp, rdv_end) WITH &&);
+
+CREATE INDEX IF NOT EXISTS rdv_planning_staff_ts_idx ON rdv_planning (staff_id, rdv_timestamp);
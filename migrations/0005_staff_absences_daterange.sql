@@ -0,0 +1,51 @@
+-- Dates typées, période en daterange et une seule absence à la fois par staff.
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE staff_absences
+    ALTER COLUMN start_date TYPE DATE USING start_date::date,
+    ALTER COLUMN end_date TYPE DATE USING end_date::date;
+
+UPDATE staff_absences SET end_date = start_date WHERE end_date < start_date;
+
+-- Fusionne les absences qui se chevauchent déjà (même staff) : on garde la plus ancienne
+WITH ordered AS (
+    SELECT id, staff_id, start_date, end_date,
+           MAX(end_date) OVER (
+               PARTITION BY staff_id ORDER BY start_date, id
+               ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+           ) AS prev_end
+    FROM staff_absences
+), islands AS (
+    SELECT id, staff_id, start_date, end_date,
+           SUM(CASE WHEN prev_end IS NULL OR start_date > prev_end THEN 1 ELSE 0 END)
+               OVER (PARTITION BY staff_id ORDER BY start_date, id) AS island
+    FROM ordered
+), merged AS (
+    SELECT i.staff_id, i.island, MIN(i.id) AS keep_id,
+           MIN(i.start_date) AS start_date, MAX(i.end_date) AS end_date,
+           string_agg(DISTINCT a.reason, ' / ') AS reason
+    FROM islands i
+    JOIN staff_absences a ON a.id = i.id
+    GROUP BY i.staff_id, i.island
+    HAVING COUNT(*) > 1
+), kept AS (
+    UPDATE staff_absences a
+    SET start_date = m.start_date, end_date = m.end_date, reason = m.reason
+    FROM merged m
+    WHERE a.id = m.keep_id
+    RETURNING a.id
+)
+DELETE FROM staff_absences a
+USING islands i, merged m
+WHERE a.id = i.id
+  AND i.staff_id = m.staff_id AND i.island = m.island
+  AND a.id <> m.keep_id;
+
+ALTER TABLE staff_absences
+    ADD COLUMN period daterange GENERATED ALWAYS AS (daterange(start_date, end_date, '[]')) STORED;
+
+CREATE INDEX IF NOT EXISTS staff_absences_period_idx ON staff_absences USING gist (period);
+
+ALTER TABLE staff_absences
+    ADD CONSTRAINT staff_absences_no_overlap
+    EXCLUDE USING gist (staff_id WITH =, period WITH &&);
@@ -0,0 +1,40 @@
+-- Notifie les instances du bot quand une table mise en cache est modifiée
+-- (y compris les modifications faites à la main en base).
+CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+BEGIN
+    IF TG_LEVEL = 'STATEMENT' THEN
+        PERFORM pg_notify('cache_invalidation', jsonb_build_object(
+            'table', TG_TABLE_NAME, 'op', TG_OP
+        )::text);
+        RETURN NULL;
+    END IF;
+
+    PERFORM pg_notify('cache_invalidation', jsonb_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'new', CASE WHEN TG_OP <> 'DELETE' THEN to_jsonb(NEW) END,
+        'old', CASE WHEN TG_OP <> 'INSERT' THEN to_jsonb(OLD) END
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['reprise_projects', 'useful_links', 'persistent_messages', 'staff_absences'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_notify', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE ON %I
+             FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation()',
+            t || '_notify', t
+        );
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_notify_truncate', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER TRUNCATE ON %I
+             FOR EACH STATEMENT EXECUTE FUNCTION notify_cache_invalidation()',
+            t || '_notify_truncate', t
+        );
+    END LOOP;
+END $$;
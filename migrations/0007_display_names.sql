@@ -0,0 +1,7 @@
+-- Dernier pseudo connu des membres affichés dans les panneaux (planning, absences)
+-- Permet d'afficher les bons noms dès le démarrage, avant que les membres soient en cache
+CREATE TABLE IF NOT EXISTS display_names (
+    user_id BIGINT PRIMARY KEY,
+    display_name TEXT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,7 @@
+-- Date de mise en service de la capture des messages (ticket_messages).
+-- Les tickets créés avant cette date sont complétés depuis l'historique Discord à la fermeture.
+-- Sur une base déjà en service la date réelle est inconnue : on prend la date de la migration,
+-- ce qui provoque au pire un rattrapage inutile (les doublons sont ignorés).
+INSERT INTO bot_state (key, value)
+VALUES ('ticket_capture_since', to_char(NOW() AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"'))
+ON CONFLICT (key) DO NOTHING;
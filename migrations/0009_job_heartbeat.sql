@@ -0,0 +1,8 @@
+-- Tâches en cours : instance propriétaire et dernier signe de vie.
+-- Seules les tâches sans signe de vie depuis un moment sont reprises par une autre instance.
+ALTER TABLE background_jobs
+    ADD COLUMN IF NOT EXISTS locked_by TEXT,
+    ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS background_jobs_running_idx
+    ON background_jobs (heartbeat_at) WHERE status = 'running';
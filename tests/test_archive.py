@@ -0,0 +1,108 @@
+"""
+Archive des pièces jointes contre un serveur HTTP local (aiohttp.web).
+
+    python -m pytest tests/test_archive.py
+"""
+import os
+import sys
+import asyncio
+import hashlib
+
+import pytest
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.archive import AttachmentArchiver
+
+
+FILES = {
+    "/capture.png": b"\x89PNG" + b"x" * 5000,
+    "/gros.bin": b"y" * 200_000,
+}
+
+
+async def _with_archiver(root, scenario, max_bytes=None):
+    async def serve(request):
+        body = FILES.get(request.path)
+        if body is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=body)
+
+    app = web.Application()
+    app.router.add_get("/{name}", serve)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    archiver = AttachmentArchiver(str(root), concurrency=2, max_bytes=max_bytes)
+    await archiver.start()
+    try:
+        await scenario(archiver, f"http://127.0.0.1:{port}")
+    finally:
+        await archiver.close()
+        await runner.cleanup()
+
+
+def _stored_files(root) -> list[str]:
+    return [
+        os.path.join(folder, name)
+        for folder, _, names in os.walk(root)
+        if os.path.basename(folder) != "tmp"
+        for name in names
+    ]
+
+
+def test_same_file_stored_once(tmp_path):
+    async def scenario(archiver, base):
+        first, second = await archiver.archive_many([f"{base}/capture.png", f"{base}/capture.png?v=2"])
+        assert first == second == hashlib.sha256(FILES["/capture.png"]).hexdigest()
+        assert archiver.exists(first)
+        with open(archiver.path_for(first), "rb") as f:
+            assert f.read() == FILES["/capture.png"]
+
+    asyncio.run(_with_archiver(tmp_path, scenario))
+    assert len(_stored_files(tmp_path)) == 1
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+def test_too_large_file_rejected(tmp_path):
+    async def scenario(archiver, base):
+        assert await archiver.archive(f"{base}/gros.bin") is None
+
+    asyncio.run(_with_archiver(tmp_path, scenario, max_bytes=100_000))
+    assert _stored_files(tmp_path) == []
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+def test_missing_file(tmp_path):
+    async def scenario(archiver, base):
+        assert await archiver.archive(f"{base}/absent.png") is None
+
+    asyncio.run(_with_archiver(tmp_path, scenario))
+    assert _stored_files(tmp_path) == []
+    assert os.listdir(tmp_path / "tmp") == []
+
+
+@pytest.mark.parametrize("digest", [
+    "A" * 64,                                # majuscules
+    "g" * 64,                                # pas hexadécimal
+    "ab" * 31,                               # trop court
+    ("./" * 27 + "../../.env")[:64],         # remontée de dossier
+    "../" + "a" * 61,
+])
+def test_path_for_rejects_invalid_digests(tmp_path, digest):
+    archiver = AttachmentArchiver(str(tmp_path))
+    with pytest.raises(ValueError):
+        archiver.path_for(digest)
+    assert not archiver.exists(digest)
+
+
+def test_path_for_stays_under_root(tmp_path):
+    archiver = AttachmentArchiver(str(tmp_path))
+    digest = hashlib.sha256(b"x").hexdigest()
+    path = archiver.path_for(digest)
+    assert os.path.commonpath([os.path.realpath(tmp_path), path]) == os.path.realpath(tmp_path)
+    assert path.endswith(os.path.join(digest[:2], digest))
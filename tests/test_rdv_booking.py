@@ -0,0 +1,115 @@
+"""
+Réservations de RDV concurrentes contre un PostgreSQL local.
+
+    DATABASE_URL=postgresql://... python -m pytest tests/test_rdv_booking.py
+    DATABASE_URL=postgresql://... python tests/test_rdv_booking.py
+
+Applique les migrations puis lance des réservations en parallèle avec
+asyncio.gather : la contrainte d'exclusion doit laisser passer exactement une
+réservation par voie (RDV_STAFF_CAPACITY voies par staff). Les RDV de test
+utilisent des ID de staff tirés au hasard et sont supprimés à la fin.
+"""
+import os
+import sys
+import asyncio
+import random
+import datetime
+from types import SimpleNamespace
+
+import asyncpg
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cogs import tickets
+from utils.migrations import migrate
+
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+PARALLEL = 20
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="DATABASE_URL non défini")
+
+
+async def _with_bot(scenario, capacity: int = 1):
+    pool = await asyncpg.create_pool(dsn=DATABASE_URL, min_size=1, max_size=PARALLEL)
+    staff_ids = []
+    previous = tickets.RDV_STAFF_CAPACITY
+    tickets.RDV_STAFF_CAPACITY = capacity
+    try:
+        await migrate(pool)
+        bot = SimpleNamespace(pool=pool)
+
+        def new_staff():
+            staff_ids.append(random.randint(10 ** 15, 10 ** 16))
+            return staff_ids[-1]
+
+        await scenario(bot, new_staff)
+    finally:
+        tickets.RDV_STAFF_CAPACITY = previous
+        if staff_ids:
+            async with pool.acquire() as conn:
+                await conn.execute("DELETE FROM rdv_planning WHERE staff_id = ANY($1::bigint[])", staff_ids)
+        await pool.close()
+
+
+def _future_ts() -> int:
+    tomorrow = datetime.datetime.now() + datetime.timedelta(days=1)
+    return int(tomorrow.replace(hour=18, minute=0, second=0, microsecond=0).timestamp())
+
+
+async def _book(bot, staff_id: int, ts: int, user_id: int):
+    return await tickets.book_rdv_slot(bot, user_id, staff_id, "Lundi", "18h00", ts, 1)
+
+
+def test_same_slot_one_winner():
+    async def scenario(bot, new_staff):
+        staff_id, ts = new_staff(), _future_ts()
+        results = await asyncio.gather(*(_book(bot, staff_id, ts, user_id) for user_id in range(PARALLEL)))
+
+        booked = [rdv for rdv, _ in results if rdv]
+        assert len(booked) == 1
+        # Les perdants reçoivent le RDV gagnant comme conflit
+        assert all(conflict["id"] == booked[0]["id"] for rdv, conflict in results if rdv is None)
+
+    asyncio.run(_with_bot(scenario))
+
+
+def test_overlapping_slots_one_winner():
+    async def scenario(bot, new_staff):
+        staff_id, ts = new_staff(), _future_ts()
+        # Décalages de 0 à 19 minutes : tous se chevauchent avec un entretien de 30 min
+        starts = [ts + 60 * i for i in range(PARALLEL)]
+        results = await asyncio.gather(*(_book(bot, staff_id, start, i) for i, start in enumerate(starts)))
+
+        assert len([rdv for rdv, _ in results if rdv]) == 1
+
+    asyncio.run(_with_bot(scenario))
+
+
+def test_one_winner_per_lane():
+    async def scenario(bot, new_staff):
+        staff_id, ts = new_staff(), _future_ts()
+        results = await asyncio.gather(*(_book(bot, staff_id, ts, user_id) for user_id in range(PARALLEL)))
+
+        booked = [rdv for rdv, _ in results if rdv]
+        assert sorted(rdv["lane"] for rdv in booked) == [0, 1]
+
+    asyncio.run(_with_bot(scenario, capacity=2))
+
+
+def test_different_staff_do_not_conflict():
+    async def scenario(bot, new_staff):
+        ts = _future_ts()
+        staff = [new_staff() for _ in range(PARALLEL)]
+        results = await asyncio.gather(*(_book(bot, staff_id, ts, i) for i, staff_id in enumerate(staff)))
+
+        assert all(rdv is not None for rdv, _ in results)
+
+    asyncio.run(_with_bot(scenario))
+
+
+if __name__ == "__main__":
+    if not DATABASE_URL:
+        sys.exit("DATABASE_URL non défini")
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1 @@
+# Modules partagés entre les cogs (rendu, cache, BDD...)
@@ -0,0 +1,93 @@
+"""
+Archive locale des pièces jointes des tickets, adressée par contenu (SHA-256).
+
+Chaque fichier est téléchargé en flux vers un fichier temporaire en calculant
+son empreinte, puis déplacé vers <racine>/<ab>/<empreinte>. Une capture d'écran
+reposté dans plusieurs tickets n'est donc stockée qu'une fois.
+"""
+import os
+import re
+import asyncio
+import hashlib
+import tempfile
+
+import aiohttp
+
+
+CHUNK_SIZE = 64 * 1024
+DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def is_digest(value: str) -> bool:
+    """Empreinte SHA-256 valide (64 caractères hexadécimaux en minuscules)."""
+    return DIGEST_RE.fullmatch(value) is not None
+
+
+class AttachmentArchiver:
+    def __init__(self, root: str, concurrency: int = 4, max_bytes: int | None = None, session: aiohttp.ClientSession | None = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session = session
+        self._owns_session = session is None
+
+    async def start(self):
+        os.makedirs(os.path.join(self.root, "tmp"), exist_ok=True)
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=300))
+
+    async def close(self):
+        if self._session and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    def path_for(self, digest: str) -> str:
+        """Chemin du fichier archivé. ValueError si l'empreinte est invalide."""
+        if not is_digest(digest):
+            raise ValueError(f"empreinte invalide : {digest[:80]!r}")
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, digest[:2], digest))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"chemin hors de l'archive : {digest!r}")
+        return path
+
+    def exists(self, digest: str) -> bool:
+        try:
+            return os.path.isfile(self.path_for(digest))
+        except ValueError:
+            return False
+
+    async def archive(self, url: str) -> str | None:
+        """Télécharge une pièce jointe et renvoie son SHA-256 (None en cas d'échec)."""
+        async with self._semaphore:
+            tmp = tempfile.NamedTemporaryFile(dir=os.path.join(self.root, "tmp"), delete=False)
+            try:
+                digest = hashlib.sha256()
+                size = 0
+                with tmp:
+                    async with self._session.get(url) as resp:
+                        resp.raise_for_status()
+                        async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                            size += len(chunk)
+                            if self.max_bytes and size > self.max_bytes:
+                                raise ValueError(f"fichier trop volumineux (> {self.max_bytes} octets)")
+                            digest.update(chunk)
+                            tmp.write(chunk)
+
+                hexdigest = digest.hexdigest()
+                target = self.path_for(hexdigest)
+                if os.path.isfile(target):
+                    os.unlink(tmp.name)
+                else:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(tmp.name, target)
+                return hexdigest
+
+            except Exception as e:
+                print(f"[ARCHIVE] Erreur téléchargement {url}: {e}")
+                if os.path.exists(tmp.name):
+                    os.unlink(tmp.name)
+                return None
+
+    async def archive_many(self, urls: list[str]) -> list[str | None]:
+        return list(await asyncio.gather(*(self.archive(url) for url in urls)))
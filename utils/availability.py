@@ -0,0 +1,32 @@
+"""
+Cache des créneaux libres pour les sélecteurs de RDV.
+
+La grille (jour -> heures libres) d'un membre du staff est calculée une fois,
+puis réutilisée tant que rien n'a changé : RDV réservé ou annulé (version de
+l'index des créneaux), absence du staff modifiée (invalidate), ou heure écoulée.
+"""
+import time
+
+
+class AvailabilityCache:
+    def __init__(self, slots):
+        self.slots = slots
+        self._grids = {}
+
+    def invalidate(self, staff_id: int | None = None):
+        """Oublie la grille d'un membre du staff, ou toutes les grilles."""
+        if staff_id is None:
+            self._grids.clear()
+        else:
+            self._grids.pop(staff_id, None)
+
+    async def get(self, staff_id: int, build) -> dict[str, list[str]]:
+        """Grille en cache, ou recalculée via la coroutine build(staff_id)."""
+        key = (self.slots.version, int(time.time() // 3600))
+        cached = self._grids.get(staff_id)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        grid = await build(staff_id)
+        self._grids[staff_id] = (key, grid)
+        return grid
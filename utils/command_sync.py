@@ -0,0 +1,52 @@
+"""
+Synchronisation des commandes slash, uniquement quand l'arbre a changé.
+
+Les commandes sont copiées sur le serveur (GUILD_ID) et les commandes globales
+sont vidées. L'empreinte de l'arbre sérialisé est gardée dans bot_state : au
+démarrage, si elle n'a pas bougé, aucun appel HTTP n'est fait.
+"""
+import json
+import hashlib
+
+
+STATE_KEY = "command_tree_hash"
+
+
+def command_tree_hash(tree, guild) -> str:
+    """Empreinte stable des commandes du serveur, telles qu'envoyées à Discord."""
+    payload = sorted(
+        (cmd.to_dict(tree) for cmd in tree.get_commands(guild=guild)),
+        key=lambda c: (c.get("type", 1), c["name"])
+    )
+    data = json.dumps({"guild": guild.id, "commands": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+async def sync_command_tree(bot, guild, force: bool = False) -> int | None:
+    """
+    Copie les commandes globales sur le serveur et synchronise si besoin.
+    Retourne le nombre de commandes synchronisées, ou None si rien n'a changé.
+    """
+    bot.tree.copy_global_to(guild=guild)
+    digest = command_tree_hash(bot.tree, guild)
+
+    if not force and bot.pool:
+        async with bot.pool.acquire() as conn:
+            stored = await conn.fetchval("SELECT value FROM bot_state WHERE key = $1", STATE_KEY)
+        if stored == digest:
+            bot.tree.clear_commands(guild=None)
+            return None
+
+    synced = await bot.tree.sync(guild=guild)
+
+    bot.tree.clear_commands(guild=None)
+    await bot.tree.sync()
+
+    if bot.pool:
+        async with bot.pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO bot_state (key, value) VALUES ($1, $2)
+                ON CONFLICT (key) DO UPDATE SET value = $2, updated_at = NOW()
+            """, STATE_KEY, digest)
+
+    return len(synced)
@@ -0,0 +1,188 @@
+"""
+Index en mémoire des absences du staff (table staff_absences).
+
+IntervalTree est un arbre binaire de recherche équilibré (treap) trié par début
+d'intervalle, où chaque nœud garde la plus grande fin de son sous-arbre : une
+recherche « qui chevauche [a, b] » élague les sous-arbres qui finissent avant a
+ou commencent après b. Les bornes sont incluses, comme les dates d'absence.
+
+AbsenceIndex s'appuie dessus pour répondre à « X est-il absent le jour D » et
+« qui est absent entre a et b » sans requête. Il est chargé au démarrage puis
+mis à jour en même temps que la base.
+"""
+import random
+import datetime
+
+
+class _Node:
+    __slots__ = ("key", "start", "end", "value", "priority", "max_end", "left", "right")
+
+    def __init__(self, key, start, end, value):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.value = value
+        self.priority = random.random()
+        self.max_end = end
+        self.left = None
+        self.right = None
+
+    def update(self):
+        self.max_end = self.end
+        if self.left and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+
+def _split(node, bound):
+    """Sépare en (< bound, >= bound) selon (start, key)."""
+    if node is None:
+        return None, None
+    if (node.start, node.key) < bound:
+        left, right = _split(node.right, bound)
+        node.right = left
+        node.update()
+        return node, right
+    left, right = _split(node.left, bound)
+    node.left = right
+    node.update()
+    return left, node
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+def _delete(node, bound):
+    """Retire le nœud (start, key) == bound. Retourne (nouvelle racine, nœud retiré)."""
+    if node is None:
+        return None, None
+    current = (node.start, node.key)
+    if current == bound:
+        return _merge(node.left, node.right), node
+    if bound < current:
+        node.left, removed = _delete(node.left, bound)
+    else:
+        node.right, removed = _delete(node.right, bound)
+    node.update()
+    return node, removed
+
+
+class IntervalTree:
+    def __init__(self):
+        self._root = None
+        self._intervals = {}
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __contains__(self, key):
+        return key in self._intervals
+
+    def add(self, key, start, end, value=None):
+        """Ajoute l'intervalle [start, end] sous `key` (remplace l'ancien si besoin)."""
+        if key in self._intervals:
+            self.remove(key)
+        node = _Node(key, start, end, value)
+        left, right = _split(self._root, (start, key))
+        self._root = _merge(_merge(left, node), right)
+        self._intervals[key] = (start, end)
+
+    def remove(self, key):
+        """Retire l'intervalle `key` et retourne sa valeur (None s'il n'existe pas)."""
+        interval = self._intervals.pop(key, None)
+        if interval is None:
+            return None
+        self._root, node = _delete(self._root, (interval[0], key))
+        return node.value if node else None
+
+    def clear(self):
+        self._root = None
+        self._intervals.clear()
+
+    def overlapping(self, start, end) -> list:
+        """Valeurs des intervalles qui chevauchent [start, end], triées par début."""
+        found = []
+        stack = []
+        node = self._root
+        while stack or node:
+            # Descente à gauche tant que le sous-arbre peut contenir un chevauchement
+            while node and node.max_end >= start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.start > end:
+                break
+            if node.end >= start:
+                found.append(node.value)
+            node = node.right
+        return found
+
+    def at(self, point) -> list:
+        """Valeurs des intervalles qui contiennent `point`."""
+        return self.overlapping(point, point)
+
+
+class AbsenceIndex:
+    def __init__(self):
+        self.loaded = False
+        self._tree = IntervalTree()
+
+    async def load(self, pool, since: datetime.date):
+        """Charge les absences qui se terminent à partir de `since`."""
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT id, staff_id, start_date, end_date, reason
+                FROM staff_absences WHERE period && daterange($1, NULL)
+            """, since)
+        self._tree.clear()
+        for row in rows:
+            self.add(row)
+        self.loaded = True
+        print(f"[ABSENCES] {len(rows)} absence(s) chargée(s) en mémoire")
+
+    def __len__(self):
+        return len(self._tree)
+
+    def add(self, row):
+        row = dict(row)
+        self._tree.add(row["id"], row["start_date"], row["end_date"], row)
+
+    def remove(self, absence_id: int) -> dict | None:
+        return self._tree.remove(absence_id)
+
+    def clear(self):
+        self._tree.clear()
+
+    def prune(self, before: datetime.date):
+        """Oublie les absences terminées avant `before`."""
+        for row in self._tree.overlapping(datetime.date.min, before - datetime.timedelta(days=1)):
+            if row["end_date"] < before:
+                self._tree.remove(row["id"])
+
+    def between(self, start: datetime.date, end: datetime.date = datetime.date.max, staff_id: int | None = None) -> list[dict]:
+        """Absences qui chevauchent [start, end], éventuellement pour un seul staff."""
+        rows = self._tree.overlapping(start, end)
+        if staff_id is not None:
+            rows = [row for row in rows if row["staff_id"] == staff_id]
+        return rows
+
+    def absent_on(self, day: datetime.date) -> list[dict]:
+        """Absences en cours le jour `day`."""
+        return self._tree.at(day)
+
+    def is_absent(self, staff_id: int, day: datetime.date) -> bool:
+        return any(row["staff_id"] == staff_id for row in self._tree.at(day))
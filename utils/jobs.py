@@ -0,0 +1,169 @@
+"""
+File de tâches durable stockée dans PostgreSQL (table background_jobs).
+
+Les cogs enregistrent un handler par type de tâche, puis empilent des tâches
+avec enqueue(). Un petit pool de workers les dépile avec FOR UPDATE SKIP LOCKED
+et réessaie en cas d'erreur.
+
+Une tâche en cours porte l'identifiant de l'instance qui l'exécute et un signe
+de vie (heartbeat_at) rafraîchi régulièrement. Elle n'est reprise que si ce
+signe de vie date de plus de stale_after secondes (instance arrêtée ou
+plantée) : un second bot démarré en parallèle ne relance pas le travail de
+l'autre.
+"""
+import json
+import uuid
+import asyncio
+import traceback
+
+
+class JobQueue:
+    def __init__(self, bot, workers: int = 2, poll_interval: float = 10, max_attempts: int = 5, stale_after: float = 300):
+        self.bot = bot
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self.owner = uuid.uuid4().hex
+        self._handlers = {}
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+
+    def register(self, kind: str, handler):
+        """Associe un type de tâche à une coroutine handler(payload: dict)."""
+        self._handlers[kind] = handler
+
+    async def enqueue(self, kind: str, payload: dict) -> int:
+        async with self.bot.pool.acquire() as conn:
+            job_id = await conn.fetchval(
+                "INSERT INTO background_jobs (kind, payload) VALUES ($1, $2) RETURNING id",
+                kind, json.dumps(payload)
+            )
+        self._wakeup.set()
+        return job_id
+
+    async def start(self):
+        if self._tasks:
+            return
+        # Les tâches abandonnées (instance arrêtée) sont reprises par _claim
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Arrêt propre : nos tâches interrompues repartent tout de suite, sans attendre stale_after
+        try:
+            async with self.bot.pool.acquire() as conn:
+                await conn.execute(
+                    "UPDATE background_jobs SET status = 'pending', locked_by = NULL WHERE status = 'running' AND locked_by = $1",
+                    self.owner
+                )
+        except Exception as e:
+            print(f"[JOBS] Impossible de libérer les tâches en cours : {e}")
+
+    async def stats(self) -> list:
+        """Nombre de tâches et âge de la plus ancienne, par type et statut."""
+        async with self.bot.pool.acquire() as conn:
+            return await conn.fetch("""
+                SELECT kind, status, COUNT(*) AS count,
+                       EXTRACT(EPOCH FROM NOW() - MIN(created_at))::BIGINT AS oldest_age
+                FROM background_jobs
+                GROUP BY kind, status
+                ORDER BY kind, status
+            """)
+
+    async def _claim(self):
+        async with self.bot.pool.acquire() as conn:
+            job = await conn.fetchrow("""
+                WITH candidate AS (
+                    SELECT id, status FROM background_jobs
+                    WHERE (status = 'pending' AND run_after <= NOW())
+                       OR (status = 'running' AND heartbeat_at < NOW() - make_interval(secs => $2))
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                UPDATE background_jobs b
+                SET status = 'running', attempts = attempts + 1, started_at = NOW(),
+                    locked_by = $1, heartbeat_at = NOW()
+                FROM candidate
+                WHERE b.id = candidate.id
+                RETURNING b.id, b.kind, b.payload, b.attempts, candidate.status = 'running' AS resumed
+            """, self.owner, float(self.stale_after))
+        if job and job["resumed"]:
+            print(f"[JOBS] Tâche {job['id']} ({job['kind']}) reprise : plus de signe de vie de son instance")
+        return job
+
+    async def _heartbeat(self, job_id: int):
+        """Signe de vie régulier tant que la tâche tourne."""
+        while True:
+            await asyncio.sleep(self.stale_after / 3)
+            try:
+                async with self.bot.pool.acquire() as conn:
+                    await conn.execute(
+                        "UPDATE background_jobs SET heartbeat_at = NOW() WHERE id = $1 AND locked_by = $2",
+                        job_id, self.owner
+                    )
+            except Exception as e:
+                print(f"[JOBS] Signe de vie de la tâche {job_id} impossible : {e}")
+
+    async def _finish(self, job, error: str | None):
+        # locked_by : une tâche reprise entre-temps par une autre instance ne lui appartient plus
+        async with self.bot.pool.acquire() as conn:
+            if error is None:
+                await conn.execute("DELETE FROM background_jobs WHERE id = $1 AND locked_by = $2", job["id"], self.owner)
+            elif job["attempts"] >= self.max_attempts:
+                await conn.execute(
+                    "UPDATE background_jobs SET status = 'failed', last_error = $3 WHERE id = $1 AND locked_by = $2",
+                    job["id"], self.owner, error
+                )
+            else:
+                # Nouvel essai avec un délai croissant : 20s, 40s, 80s...
+                delay = 10 * 2 ** job["attempts"]
+                await conn.execute("""
+                    UPDATE background_jobs
+                    SET status = 'pending', locked_by = NULL, last_error = $3, run_after = NOW() + make_interval(secs => $4)
+                    WHERE id = $1 AND locked_by = $2
+                """, job["id"], self.owner, error, delay)
+
+    async def _worker(self, index: int):
+        # Les handlers ont besoin du cache Discord (salons, membres) : start() est
+        # appelé dans setup_hook, avant la connexion à la gateway
+        await self.bot.wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"[JOBS] Worker {index} : erreur BDD {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            handler = self._handlers.get(job["kind"])
+            error = None
+            if handler is None:
+                error = f"aucun handler pour '{job['kind']}'"
+            else:
+                heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+                try:
+                    await handler(json.loads(job["payload"]))
+                except Exception as e:
+                    error = f"{e}\n{traceback.format_exc(limit=5)}"
+                    print(f"[JOBS] Tâche {job['id']} ({job['kind']}) en échec : {e}")
+                finally:
+                    heartbeat.cancel()
+
+            try:
+                await self._finish(job, error)
+            except Exception as e:
+                print(f"[JOBS] Impossible de clôturer la tâche {job['id']} : {e}")
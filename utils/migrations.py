@@ -0,0 +1,75 @@
+"""
+Migrations versionnées du schéma PostgreSQL.
+
+Les fichiers migrations/NNNN_nom.sql sont appliqués dans l'ordre, une seule fois.
+La version courante est gardée dans la table schema_version. Au démarrage, une
+seule requête compare cette version à la dernière migration ; s'il en manque,
+elles sont toutes appliquées dans une transaction, sous un verrou consultatif
+pour qu'une seule instance du bot migre à la fois.
+"""
+import os
+import re
+
+import asyncpg
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+MIGRATION_LOCK_ID = 72_001  # clé du pg_advisory_xact_lock
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list[tuple[int, str, str]]:
+    """(version, nom, sql) de chaque fichier de migration, triés par version."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            migrations.append((int(match.group(1)), match.group(2), f.read()))
+    migrations.sort()
+
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Deux migrations portent le même numéro de version")
+    return migrations
+
+
+async def current_version(conn) -> int:
+    try:
+        return await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    except asyncpg.UndefinedTableError:
+        return 0
+
+
+async def migrate(pool) -> int:
+    """Applique les migrations manquantes. Retourne la version du schéma."""
+    migrations = load_migrations()
+    latest = migrations[-1][0] if migrations else 0
+
+    async with pool.acquire() as conn:
+        version = await current_version(conn)
+        if version >= latest:
+            return version
+
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK_ID)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                )
+            """)
+
+            # Une autre instance a pu migrer pendant qu'on attendait le verrou
+            version = await current_version(conn)
+            for number, name, sql in migrations:
+                if number <= version:
+                    continue
+                await conn.execute(sql)
+                await conn.execute("INSERT INTO schema_version (version, name) VALUES ($1, $2)", number, name)
+                print(f"[DB] Migration {number:04d}_{name} appliquée")
+                version = number
+
+    return version
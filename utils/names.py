@@ -0,0 +1,112 @@
+"""
+Résolution ID -> pseudo pour l'affichage des panneaux.
+
+Ordre de recherche :
+1. cache discord.py (membre du serveur ou utilisateur connu) ;
+2. cache LRU en mémoire ;
+3. dernier pseudo connu, enregistré dans la table display_names ;
+4. requête groupée à la gateway (guild.query_members, 100 IDs par requête).
+
+Un panneau de 15 lignes coûte donc au pire une requête SQL et une requête
+gateway, au lieu d'un appel REST par membre. Les pseudos obtenus depuis
+Discord sont réenregistrés en base quand ils ont changé.
+"""
+import asyncio
+from collections import OrderedDict
+
+
+QUERY_BATCH = 100  # maximum accepté par guild.query_members(user_ids=...)
+
+
+class NameResolver:
+    def __init__(self, bot, guild_id: int, capacity: int = 2000, timeout: float = 5.0):
+        self.bot = bot
+        self.guild_id = guild_id
+        self.capacity = capacity
+        self.timeout = timeout
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _remember(self, user_id: int, name: str):
+        self._cache[user_id] = name
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    def _live(self, guild, user_id: int) -> str | None:
+        member = guild.get_member(user_id) if guild else None
+        user = member or self.bot.get_user(user_id)
+        return user.display_name if user else None
+
+    async def resolve(self, user_ids, fetch: bool = True) -> dict[int, str]:
+        """
+        Pseudos des IDs demandés. Les IDs introuvables (membre parti...) sont
+        absents du résultat. fetch=False évite l'appel gateway (réponse immédiate).
+        """
+        guild = self.bot.get_guild(self.guild_id)
+        names = {}
+        changed = {}
+        missing = []
+
+        for user_id in dict.fromkeys(uid for uid in user_ids if uid):
+            live = self._live(guild, user_id)
+            if live is not None:
+                if self._cache.get(user_id) != live:
+                    changed[user_id] = live
+                self._remember(user_id, live)
+                names[user_id] = live
+            elif user_id in self._cache:
+                self._cache.move_to_end(user_id)
+                names[user_id] = self._cache[user_id]
+            else:
+                missing.append(user_id)
+
+        if missing and self.bot.pool:
+            try:
+                async with self.bot.pool.acquire() as conn:
+                    rows = await conn.fetch(
+                        "SELECT user_id, display_name FROM display_names WHERE user_id = ANY($1::bigint[])",
+                        missing
+                    )
+            except Exception as e:
+                print(f"[NAMES] Erreur lecture display_names : {e}")
+                rows = []
+            for row in rows:
+                self._remember(row["user_id"], row["display_name"])
+                names[row["user_id"]] = row["display_name"]
+            missing = [uid for uid in missing if uid not in names]
+
+        if missing and fetch and guild:
+            for i in range(0, len(missing), QUERY_BATCH):
+                batch = missing[i:i + QUERY_BATCH]
+                try:
+                    members = await asyncio.wait_for(
+                        guild.query_members(user_ids=batch, limit=len(batch)), timeout=self.timeout
+                    )
+                except Exception as e:
+                    print(f"[NAMES] Erreur requête gateway ({len(batch)} membre(s)) : {e}")
+                    break
+                for member in members:
+                    self._remember(member.id, member.display_name)
+                    names[member.id] = member.display_name
+                    changed[member.id] = member.display_name
+
+        if changed:
+            await self._save(changed)
+        return names
+
+    async def _save(self, names: dict[int, str]):
+        if not self.bot.pool:
+            return
+        try:
+            async with self.bot.pool.acquire() as conn:
+                await conn.executemany("""
+                    INSERT INTO display_names (user_id, display_name) VALUES ($1, $2)
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET display_name = EXCLUDED.display_name, updated_at = NOW()
+                    WHERE display_names.display_name <> EXCLUDED.display_name
+                """, list(names.items()))
+        except Exception as e:
+            print(f"[NAMES] Erreur enregistrement display_names : {e}")
@@ -0,0 +1,101 @@
+"""
+Bus d'invalidation des caches via LISTEN/NOTIFY PostgreSQL.
+
+Des triggers (migration 0006) publient sur le canal cache_invalidation un JSON
+{"table", "op", "new", "old"} à chaque modification des tables mises en cache.
+Les cogs s'abonnent par table et ne rafraîchissent que ce qui a changé.
+
+L'écoute utilise une connexion dédiée (hors pool). Si elle tombe, le bus se
+reconnecte puis envoie un événement "RESYNC" à chaque abonné : les
+notifications manquées pendant la coupure ne sont pas rejouées par PostgreSQL.
+"""
+import json
+import asyncio
+
+import asyncpg
+
+
+CHANNEL = "cache_invalidation"
+
+
+class InvalidationBus:
+    def __init__(self, dsn: str, retry_delay: float = 5, ping_interval: float = 60):
+        self.dsn = dsn
+        self.retry_delay = retry_delay
+        self.ping_interval = ping_interval
+        self._subscribers = {}
+        self._task = None
+        self._pending = set()
+        self._connected_once = False
+
+    def subscribe(self, table: str, callback):
+        """
+        Abonne la coroutine callback(event: dict) aux modifications de `table`.
+        Un rechargement de cog remplace l'abonnement précédent du même handler.
+        """
+        self._subscribers.setdefault(table, {})[callback.__qualname__] = callback
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn)
+            except Exception as e:
+                print(f"[NOTIFY] Connexion impossible : {e}")
+                await asyncio.sleep(self.retry_delay)
+                continue
+
+            lost = asyncio.Event()
+            try:
+                conn.add_termination_listener(lambda _conn: lost.set())
+                await conn.add_listener(CHANNEL, self._on_notify)
+                print("[NOTIFY] En écoute des invalidations de cache")
+
+                if self._connected_once:
+                    for table in self._subscribers:
+                        self._dispatch({"table": table, "op": "RESYNC"})
+                self._connected_once = True
+
+                # Une connexion coupée sans fermeture propre n'est détectée qu'en l'utilisant
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=self.ping_interval)
+                    except asyncio.TimeoutError:
+                        await conn.execute("SELECT 1")
+            except Exception as e:
+                print(f"[NOTIFY] Connexion perdue : {e}")
+            finally:
+                if not conn.is_closed():
+                    conn.terminate()
+
+            print(f"[NOTIFY] Reconnexion dans {self.retry_delay}s")
+            await asyncio.sleep(self.retry_delay)
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            print(f"[NOTIFY] Message illisible : {payload[:100]}")
+            return
+        self._dispatch(event)
+
+    def _dispatch(self, event: dict):
+        for callback in list(self._subscribers.get(event.get("table"), {}).values()):
+            task = asyncio.create_task(self._call(callback, event))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _call(self, callback, event: dict):
+        try:
+            await callback(event)
+        except Exception as e:
+            print(f"[NOTIFY] Erreur handler {callback.__qualname__} ({event.get('table')}) : {e}")
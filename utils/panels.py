@@ -0,0 +1,139 @@
+"""
+Planification et publication des panneaux persistants (planning, absences, liens).
+
+Chaque mutation demande un rendu via request(). Les demandes rapprochées sont
+regroupées (debounce), un seul rendu tourne à la fois par panneau, et une demande
+arrivée pendant un rendu en relance un dernier avec l'état le plus récent.
+
+Les messages des panneaux (table persistent_messages) sont chargés une fois au
+démarrage et édités via des PartialMessage, sans fetch préalable. L'empreinte du
+dernier contenu publié est gardée pour ne pas rééditer un panneau identique.
+"""
+import json
+import asyncio
+import hashlib
+
+import discord
+
+
+def panel_hash(embed, view=None) -> str:
+    """Empreinte stable du contenu d'un panneau (embed + composants)."""
+    payload = {
+        "embed": embed.to_dict(),
+        "components": view.to_components() if view else []
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class PanelScheduler:
+    def __init__(self, delay: float = 1.5):
+        self.delay = delay
+        self._renderers = {}
+        self._dirty = set()
+        self._tasks = {}
+        self._handles = {}
+        self._hashes = {}
+        self._pool = None
+
+    async def load(self, pool):
+        """Charge les messages des panneaux depuis persistent_messages."""
+        self._pool = pool
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("SELECT key, message_id, channel_id, content_hash FROM persistent_messages")
+        self._handles.clear()
+        self._hashes.clear()
+        for row in rows:
+            self._handles[row["key"]] = (row["channel_id"], row["message_id"])
+            if row["content_hash"]:
+                self._hashes[row["key"]] = row["content_hash"]
+        print(f"[PANELS] {len(rows)} panneau(x) chargé(s)")
+
+    async def on_remote_change(self, event: dict):
+        """Applique une modification de persistent_messages reçue par le bus d'invalidation."""
+        if event["op"] in ("RESYNC", "TRUNCATE"):
+            await self.load(self._pool)
+            return
+
+        if event["op"] == "DELETE":
+            key = event["old"]["key"]
+            self._handles.pop(key, None)
+            self._hashes.pop(key, None)
+            return
+
+        row = event["new"]
+        if event["op"] == "UPDATE" and event["old"]["key"] != row["key"]:
+            self._handles.pop(event["old"]["key"], None)
+            self._hashes.pop(event["old"]["key"], None)
+        self._handles[row["key"]] = (row["channel_id"], row["message_id"])
+        if row.get("content_hash"):
+            self._hashes[row["key"]] = row["content_hash"]
+        else:
+            self._hashes.pop(row["key"], None)
+
+    def handle(self, key: str) -> tuple[int, int] | None:
+        """(channel_id, message_id) du panneau, ou None."""
+        return self._handles.get(key)
+
+    async def set_handle(self, pool, key: str, channel_id: int, message_id: int, digest: str | None = None):
+        """Enregistre le message d'un panneau (nouveau message ou /setup_*)."""
+        self._handles[key] = (channel_id, message_id)
+        if digest:
+            self._hashes[key] = digest
+        else:
+            self._hashes.pop(key, None)
+        async with pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO persistent_messages (key, message_id, channel_id, content_hash)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (key) DO UPDATE SET message_id = $2, channel_id = $3, content_hash = $4
+            """, key, message_id, channel_id, digest)
+
+    async def publish(self, bot, key: str, channel, embed, view=None, can_create=None) -> bool:
+        """
+        Édite le panneau `key`, ou le recrée dans `channel` si son message n'existe plus.
+        can_create : coroutine optionnelle qui autorise (ou non) l'envoi d'un nouveau message.
+        Retourne True si Discord a été appelé.
+        """
+        digest = panel_hash(embed, view)
+        handle = self._handles.get(key)
+
+        if handle and self._hashes.get(key) == digest:
+            return False
+
+        if handle:
+            channel_id, message_id = handle
+            try:
+                message = bot.get_partial_messageable(channel_id).get_partial_message(message_id)
+                await message.edit(embed=embed, view=view)
+                self._hashes[key] = digest
+                async with bot.pool.acquire() as conn:
+                    await conn.execute("UPDATE persistent_messages SET content_hash = $2 WHERE key = $1", key, digest)
+                return True
+            except discord.NotFound:
+                print(f"[PANELS] Message du panneau {key} introuvable, création d'un nouveau")
+
+        if can_create and not await can_create():
+            return False
+
+        msg = await channel.send(embed=embed, view=view)
+        await self.set_handle(bot.pool, key, channel.id, msg.id, digest)
+        return True
+
+    def request(self, key: str, render):
+        """Demande le rendu du panneau `key` via la coroutine render()."""
+        self._renderers[key] = render
+        self._dirty.add(key)
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._run(key))
+
+    async def _run(self, key: str):
+        try:
+            while key in self._dirty:
+                await asyncio.sleep(self.delay)
+                self._dirty.discard(key)
+                try:
+                    await self._renderers[key]()
+                except Exception as e:
+                    print(f"[PANELS] Erreur rendu {key}: {e}")
+        finally:
+            self._tasks.pop(key, None)
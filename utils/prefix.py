@@ -0,0 +1,72 @@
+"""
+Index de préfixes en mémoire pour l'autocomplétion des commandes slash.
+
+Les clés sont normalisées (minuscules, sans accents) et gardées dans une liste
+triée : une recherche est une dichotomie suivie d'un parcours des seules
+entrées qui commencent par le texte tapé. Une valeur peut avoir plusieurs clés
+(ex. nom du salon et ID du ticket).
+"""
+import bisect
+import unicodedata
+
+
+def normalize(text: str) -> str:
+    """Minuscules et sans accents : « Équipe » -> « equipe »."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._entries = []
+        self._values = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def rebuild(self, items):
+        """Remplace le contenu par items : (label, value) ou (label, value, clés)."""
+        self._entries = []
+        self._values = {}
+        for item in items:
+            label, value = item[0], item[1]
+            keys = item[2] if len(item) > 2 else (label,)
+            self._values[value] = (label, [normalize(k) for k in keys])
+            self._entries.extend((key, label, value) for key in self._values[value][1])
+        self._entries.sort(key=lambda e: (e[0], e[1]))
+
+    def add(self, label: str, value, keys=None):
+        self.remove(value)
+        normalized = [normalize(k) for k in (keys or (label,))]
+        self._values[value] = (label, normalized)
+        for key in normalized:
+            bisect.insort(self._entries, (key, label, value), key=lambda e: (e[0], e[1]))
+
+    def remove(self, value):
+        known = self._values.pop(value, None)
+        if known is None:
+            return
+        label, keys = known
+        for key in keys:
+            i = bisect.bisect_left(self._entries, (key, label), key=lambda e: (e[0], e[1]))
+            while i < len(self._entries) and self._entries[i][0] == key:
+                if self._entries[i][2] == value:
+                    del self._entries[i]
+                    break
+                i += 1
+
+    def search(self, text: str, limit: int = 25) -> list[tuple[str, object]]:
+        """(label, value) des entrées dont une clé commence par `text`."""
+        prefix = normalize(text)
+        i = bisect.bisect_left(self._entries, prefix, key=lambda e: e[0])
+        results = []
+        seen = set()
+        while i < len(self._entries) and len(results) < limit:
+            key, label, value = self._entries[i]
+            if not key.startswith(prefix):
+                break
+            if value not in seen:
+                seen.add(value)
+                results.append((label, value))
+            i += 1
+        return results
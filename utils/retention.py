@@ -0,0 +1,182 @@
+"""
+Entretien de la table ticket_logs : partitions mensuelles et purge des vieux logs.
+
+Les nouvelles installations créent ticket_logs partitionnée par mois sur closed_at :
+la purge détache puis supprime les partitions entières. Les anciennes installations
+(table classique) sont purgées par petits lots pour ne pas verrouiller la table.
+
+Les messages capturés (ticket_messages) sont supprimés à la fermeture du ticket ;
+la purge retire ceux des tickets restés sans activité (salon supprimé à la main...).
+"""
+import asyncio
+import datetime
+
+
+DELETE_BATCH_SIZE = 1000
+
+
+def month_start(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def next_month(day: datetime.date) -> datetime.date:
+    return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start: datetime.date) -> str:
+    return f"ticket_logs_y{start.year}m{start.month:02d}"
+
+
+async def is_partitioned(conn) -> bool:
+    kind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass('ticket_logs')")
+    return kind == "p"
+
+
+async def ensure_log_partitions(conn, today: datetime.date, months_ahead: int = 1):
+    """Crée la partition du mois courant et des mois suivants si besoin."""
+    start = month_start(today)
+    for _ in range(months_ahead + 1):
+        end = next_month(start)
+        try:
+            await create_log_partition(conn, start, end)
+        except Exception as e:
+            print(f"[LOGS] Impossible de créer la partition {partition_name(start)} : {e}")
+        start = end
+
+
+async def create_log_partition(conn, start: datetime.date, end: datetime.date):
+    """
+    Crée la partition [start, end). Si des logs de cette période sont déjà dans
+    la partition DEFAULT (bot arrêté plus d'un mois), PostgreSQL refuse la
+    création : ils sont d'abord mis de côté, puis réinsérés dans la nouvelle partition.
+    """
+    name = partition_name(start)
+    if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", name):
+        return
+
+    bounds = (datetime.datetime.combine(start, datetime.time()), datetime.datetime.combine(end, datetime.time()))
+    async with conn.transaction():
+        moved = 0
+        if await conn.fetchval("SELECT to_regclass('ticket_logs_default') IS NOT NULL"):
+            # Colonnes réelles uniquement : search_vector est générée
+            columns = ", ".join(await conn.fetchval("""
+                SELECT array_agg(quote_ident(column_name::text) ORDER BY ordinal_position)
+                FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'ticket_logs' AND is_generated = 'NEVER'
+            """))
+            await conn.execute("CREATE TEMP TABLE moved_logs (LIKE ticket_logs_default) ON COMMIT DROP")
+            result = await conn.execute("""
+                WITH moved AS (
+                    DELETE FROM ticket_logs_default WHERE closed_at >= $1 AND closed_at < $2 RETURNING *
+                )
+                INSERT INTO moved_logs SELECT * FROM moved
+            """, *bounds)
+            moved = int(result.split(" ")[2]) if result else 0
+
+        await conn.execute(f"""
+            CREATE TABLE {name} PARTITION OF ticket_logs
+            FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+        """)
+
+        if moved:
+            await conn.execute(f"INSERT INTO ticket_logs ({columns}) SELECT {columns} FROM moved_logs")
+            print(f"[LOGS] {moved} log(s) déplacé(s) de la partition DEFAULT vers {name}")
+
+
+async def list_log_partitions(conn) -> list:
+    return await conn.fetch("""
+        SELECT c.relname AS name,
+               pg_get_expr(c.relpartbound, c.oid) AS bounds,
+               pg_total_relation_size(c.oid) AS size,
+               GREATEST(c.reltuples, 0)::BIGINT AS rows
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'ticket_logs'::regclass
+        ORDER BY c.relname
+    """)
+
+
+async def purge_ticket_logs(pool, cutoff: datetime.date) -> int:
+    """
+    Supprime les logs fermés avant cutoff.
+    Retourne le nombre de partitions supprimées (mode partitionné) ou de lignes (mode classique).
+    """
+    async with pool.acquire() as conn:
+        partitioned = await is_partitioned(conn)
+
+        if partitioned:
+            dropped = 0
+            for part in await list_log_partitions(conn):
+                name = part["name"]
+                if not name.startswith("ticket_logs_y"):
+                    continue  # partition DEFAULT
+                start = datetime.date(int(name[13:17]), int(name[18:20]), 1)
+                if next_month(start) <= cutoff:
+                    await conn.execute(f"ALTER TABLE ticket_logs DETACH PARTITION {name}")
+                    await conn.execute(f"DROP TABLE {name}")
+                    print(f"[LOGS] Partition {name} supprimée")
+                    dropped += 1
+            return dropped
+
+    # Table classique : petits lots, chacun dans sa propre transaction
+    deleted = 0
+    while True:
+        async with pool.acquire() as conn:
+            result = await conn.execute("""
+                DELETE FROM ticket_logs WHERE ctid IN (
+                    SELECT ctid FROM ticket_logs WHERE closed_at < $1 LIMIT $2
+                )
+            """, datetime.datetime.combine(cutoff, datetime.time()), DELETE_BATCH_SIZE)
+        count = int(result.split(" ")[1]) if result else 0
+        deleted += count
+        if count < DELETE_BATCH_SIZE:
+            break
+        await asyncio.sleep(0.5)
+
+    if deleted:
+        print(f"[LOGS] {deleted} log(s) supprimé(s)")
+    return deleted
+
+
+async def purge_ticket_messages(pool, cutoff: datetime.date) -> int:
+    """
+    Supprime les messages capturés des tickets sans message depuis cutoff
+    (normalement déjà supprimés à la fermeture du ticket). Retourne le nombre de lignes.
+    """
+    async with pool.acquire() as conn:
+        ticket_ids = [row["ticket_id"] for row in await conn.fetch("""
+            SELECT ticket_id FROM ticket_messages
+            GROUP BY ticket_id
+            HAVING MAX(created_at) < $1
+        """, datetime.datetime.combine(cutoff, datetime.time(), tzinfo=datetime.timezone.utc))]
+
+    deleted = 0
+    while ticket_ids:
+        async with pool.acquire() as conn:
+            result = await conn.execute("""
+                DELETE FROM ticket_messages WHERE ctid IN (
+                    SELECT ctid FROM ticket_messages WHERE ticket_id = ANY($1::bigint[]) LIMIT $2
+                )
+            """, ticket_ids, DELETE_BATCH_SIZE)
+        count = int(result.split(" ")[1]) if result else 0
+        deleted += count
+        if count < DELETE_BATCH_SIZE:
+            break
+        await asyncio.sleep(0.5)
+
+    if deleted:
+        print(f"[LOGS] {deleted} message(s) capturé(s) supprimé(s) ({len(ticket_ids)} ticket(s))")
+    return deleted
+
+
+async def ticket_logs_stats(conn) -> list[dict]:
+    """Taille et nombre de lignes par partition (ou pour la table entière)."""
+    if await is_partitioned(conn):
+        return [dict(row) for row in await list_log_partitions(conn)]
+
+    row = await conn.fetchrow("""
+        SELECT 'ticket_logs' AS name, NULL AS bounds,
+               pg_total_relation_size('ticket_logs') AS size,
+               (SELECT COUNT(*) FROM ticket_logs) AS rows
+    """)
+    return [dict(row)]
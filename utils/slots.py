@@ -0,0 +1,102 @@
+"""
+Copie en mémoire des RDV réservés (table rdv_planning), triée par horodatage.
+
+Chaque membre du staff a son propre calendrier : il peut mener jusqu'à
+`capacity` entretiens en même temps. Les vérifications de créneau se font par
+recherche dichotomique dans la liste du staff concerné, sans requête.
+L'index est mis à jour en même temps que la base (réservation, annulation,
+/clear_rdv, purge des RDV passés). La contrainte d'exclusion de rdv_planning
+reste l'arbitre final en cas de course.
+"""
+import bisect
+
+
+class SlotIndex:
+    def __init__(self, length: int = 1800, capacity: int = 1):
+        self.length = length
+        self.capacity = capacity
+        self.loaded = False
+        self.version = 0  # incrémenté à chaque modification (invalide les caches dérivés)
+        self._keys = []
+        self._by_staff = {}
+        self._rows = {}
+        self._max_length = length
+
+    async def load(self, pool, since: int = 0):
+        """Charge les RDV dont l'horodatage est postérieur à `since`."""
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT id, user_id, staff_id, day, hour, rdv_timestamp, rdv_end, lane, channel_id
+                FROM rdv_planning WHERE rdv_timestamp >= $1
+            """, since)
+        self._keys = []
+        self._by_staff = {}
+        self._rows = {}
+        for row in rows:
+            self.add(dict(row))
+        self.loaded = True
+        self.version += 1
+        print(f"[RDV] {len(rows)} RDV chargé(s) en mémoire")
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, row: dict):
+        if row["id"] in self._rows:
+            return
+        row = dict(row)
+        row.setdefault("rdv_end", row["rdv_timestamp"] + self.length)
+        self._rows[row["id"]] = row
+        key = (row["rdv_timestamp"], row["id"])
+        bisect.insort(self._keys, key)
+        bisect.insort(self._by_staff.setdefault(row["staff_id"], []), key)
+        self._max_length = max(self._max_length, row["rdv_end"] - row["rdv_timestamp"])
+        self.version += 1
+
+    def remove(self, rdv_id: int) -> dict | None:
+        row = self._rows.pop(rdv_id, None)
+        if row is not None:
+            key = (row["rdv_timestamp"], rdv_id)
+            for keys in (self._keys, self._by_staff[row["staff_id"]]):
+                del keys[bisect.bisect_left(keys, key)]
+            self.version += 1
+        return row
+
+    def clear(self):
+        self._keys.clear()
+        self._by_staff.clear()
+        self._rows.clear()
+        self.version += 1
+
+    def prune(self, before: int):
+        """Oublie les RDV antérieurs à `before`."""
+        i = bisect.bisect_left(self._keys, (before,))
+        for _, rdv_id in self._keys[:i]:
+            row = self._rows.pop(rdv_id)
+            keys = self._by_staff[row["staff_id"]]
+            del keys[bisect.bisect_left(keys, (row["rdv_timestamp"], rdv_id))]
+        del self._keys[:i]
+        if i:
+            self.version += 1
+
+    def conflicts(self, ts: int, staff_id: int) -> list[dict]:
+        """RDV du staff qui chevauchent un entretien commençant à `ts`."""
+        keys = self._by_staff.get(staff_id, [])
+        end = ts + self.length
+        i = bisect.bisect_left(keys, (ts - self._max_length + 1,))
+        found = []
+        while i < len(keys) and keys[i][0] < end:
+            row = self._rows[keys[i][1]]
+            if row["rdv_end"] > ts:
+                found.append(row)
+            i += 1
+        return found
+
+    def is_free(self, ts: int, staff_id: int) -> bool:
+        return len(self.conflicts(ts, staff_id)) < self.capacity
+
+    def upcoming(self, after: int, limit: int | None = None) -> list[dict]:
+        """RDV postérieurs à `after`, par ordre chronologique."""
+        i = bisect.bisect_right(self._keys, (after, float("inf")))
+        keys = self._keys[i:i + limit] if limit else self._keys[i:]
+        return [self._rows[rdv_id] for _, rdv_id in keys]
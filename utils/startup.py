@@ -0,0 +1,72 @@
+"""
+Tâches de démarrage des cogs, exécutées une seule fois par processus.
+
+Chaque cog enregistre ses coroutines d'initialisation avec leurs besoins :
+- "db"    : le pool PostgreSQL est prêt (fin de setup_hook)
+- "ready" : le cache Discord est rempli (premier on_ready)
+
+Quand une phase est atteinte, toutes les tâches dont les besoins sont satisfaits
+sont lancées en parallèle, chacune avec un délai maximum. Un on_ready répété
+(reconnexion) ou un rechargement d'extension ne relance pas une tâche déjà faite.
+"""
+import time
+import asyncio
+
+
+class StartupRunner:
+    def __init__(self, timeout: float = 30):
+        self.timeout = timeout
+        self._pending = {}
+        self._done = set()
+        self._phases = set()
+        self._background = set()
+
+    def register(self, name: str, func, needs=("ready",), timeout: float | None = None):
+        """Enregistre la coroutine func() sous `name` (ignorée si déjà enregistrée ou faite)."""
+        if name in self._done or name in self._pending:
+            return
+        needs = frozenset(needs)
+        self._pending[name] = (func, needs, timeout or self.timeout)
+
+        # Extension chargée après coup : la phase est déjà passée, on lance tout de suite
+        if needs <= self._phases:
+            task = asyncio.create_task(self._run_batch([name]))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    def reached(self, phase: str) -> bool:
+        return phase in self._phases
+
+    async def reach(self, phase: str):
+        """Marque la phase comme atteinte et lance les tâches devenues exécutables."""
+        if phase in self._phases:
+            return
+        self._phases.add(phase)
+
+        names = [name for name, (_, needs, _) in self._pending.items() if needs <= self._phases]
+        start = time.perf_counter()
+        await self._run_batch(names)
+        print(f"[STARTUP] Phase {phase} : {len(names)} tâche(s) en {time.perf_counter() - start:.2f}s")
+
+        if phase == "ready" and self._pending:
+            waiting = ", ".join(f"{name} ({'/'.join(sorted(needs - self._phases))})" for name, (_, needs, _) in self._pending.items())
+            print(f"[STARTUP] En attente : {waiting}")
+
+    async def _run_batch(self, names: list[str]):
+        jobs = []
+        for name in names:
+            func, _, timeout = self._pending.pop(name)
+            jobs.append(self._run_one(name, func, timeout))
+        await asyncio.gather(*jobs)
+
+    async def _run_one(self, name: str, func, timeout: float):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(func(), timeout=timeout)
+            print(f"[STARTUP] {name} OK ({time.perf_counter() - start:.2f}s)")
+        except asyncio.TimeoutError:
+            print(f"[STARTUP] {name} : délai dépassé ({timeout}s)")
+        except Exception as e:
+            print(f"[STARTUP] {name} : erreur {e}")
+        finally:
+            self._done.add(name)
@@ -0,0 +1,153 @@
+"""
+Rendu HTML autonome des transcripts de tickets.
+
+Les fonctions ici ne dépendent pas de discord.py : elles reçoivent des dicts
+simples pour pouvoir tourner dans un ProcessPoolExecutor sans bloquer le bot.
+"""
+import html
+import datetime
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+STYLE = """
+body { background: #313338; color: #dbdee1; font-family: 'gg sans', 'Helvetica Neue', Arial, sans-serif; margin: 0; padding: 24px; }
+header { border-bottom: 1px solid #3f4147; margin-bottom: 16px; padding-bottom: 12px; }
+header h1 { font-size: 20px; margin: 0 0 4px 0; color: #f2f3f5; }
+header p { margin: 0; color: #949ba4; font-size: 13px; }
+.msg { display: flex; flex-direction: column; padding: 6px 8px; border-radius: 4px; }
+.msg:hover { background: #2e3035; }
+.msg.staff { border-left: 3px solid #8b0000; background: #35292b; }
+.msg.deleted { opacity: .55; }
+.meta { font-size: 13px; color: #949ba4; }
+.author { font-weight: 600; color: #f2f3f5; margin-right: 6px; }
+.staff .author { color: #ff6b6b; }
+.badge { background: #8b0000; color: #fff; font-size: 10px; border-radius: 3px; padding: 1px 4px; margin-right: 6px; }
+.content { white-space: pre-wrap; word-wrap: break-word; margin-top: 2px; }
+.reply { font-size: 12px; color: #949ba4; margin-bottom: 2px; }
+.reply a { color: #00a8fc; text-decoration: none; }
+.edited { font-size: 11px; color: #949ba4; }
+.original { font-size: 12px; color: #949ba4; border-left: 2px solid #4e5058; padding-left: 6px; margin-top: 2px; white-space: pre-wrap; }
+.embed { border-left: 4px solid #8b0000; background: #2b2d31; border-radius: 4px; padding: 8px 12px; margin-top: 6px; max-width: 520px; }
+.embed-author { font-size: 13px; font-weight: 600; }
+.embed-title { font-weight: 700; color: #f2f3f5; margin: 2px 0; }
+.embed-field { margin-top: 6px; }
+.embed-field-name { font-weight: 600; font-size: 13px; color: #f2f3f5; }
+.embed-field-value { font-size: 13px; white-space: pre-wrap; }
+.embed-footer { font-size: 11px; color: #949ba4; margin-top: 6px; }
+.embed img, .attachment img { max-width: 400px; max-height: 300px; border-radius: 4px; margin-top: 6px; display: block; }
+.attachment a { color: #00a8fc; }
+footer { margin-top: 24px; color: #949ba4; font-size: 12px; }
+"""
+
+
+def _text(value) -> str:
+    return html.escape(str(value)) if value else ""
+
+
+def _attachment_name(url: str) -> str:
+    return url.split("?")[0].rsplit("/", 1)[-1]
+
+
+def render_header(channel_name: str, generated_at: datetime.datetime) -> str:
+    """Début du document HTML."""
+    return (
+        "<!DOCTYPE html>\n<html lang=\"fr\">\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>Transcript - {_text(channel_name)}</title>\n"
+        f"<style>{STYLE}</style>\n</head>\n<body>\n"
+        f"<header><h1>TRANSCRIPT - {_text(channel_name)}</h1>"
+        f"<p>Date : {generated_at.strftime('%d/%m/%Y %H:%M')}</p></header>\n<main>\n"
+    )
+
+
+def render_footer(message_count: int) -> str:
+    """Fin du document HTML."""
+    return f"</main>\n<footer>{message_count} message(s) • Remember RolePlay</footer>\n</body>\n</html>\n"
+
+
+def render_embed(embed: dict) -> str:
+    parts = []
+    color = embed.get("color")
+    style = f" style=\"border-left-color: #{color:06x}\"" if isinstance(color, int) else ""
+    parts.append(f"<div class=\"embed\"{style}>")
+
+    author = embed.get("author") or {}
+    if author.get("name"):
+        parts.append(f"<div class=\"embed-author\">{_text(author['name'])}</div>")
+    if embed.get("title"):
+        parts.append(f"<div class=\"embed-title\">{_text(embed['title'])}</div>")
+    if embed.get("description"):
+        parts.append(f"<div class=\"content\">{_text(embed['description'])}</div>")
+
+    for field in embed.get("fields") or []:
+        parts.append(
+            "<div class=\"embed-field\">"
+            f"<div class=\"embed-field-name\">{_text(field.get('name'))}</div>"
+            f"<div class=\"embed-field-value\">{_text(field.get('value'))}</div>"
+            "</div>"
+        )
+
+    image = (embed.get("image") or {}).get("url")
+    if image:
+        parts.append(f"<img src=\"{_text(image)}\" alt=\"\">")
+
+    footer = (embed.get("footer") or {}).get("text")
+    if footer:
+        parts.append(f"<div class=\"embed-footer\">{_text(footer)}</div>")
+
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def render_attachment(url: str, digest: str | None = None, archive_base_url: str | None = None) -> str:
+    name = _attachment_name(url)
+    link = f"{archive_base_url.rstrip('/')}/{digest}" if digest and archive_base_url else url
+    archived = f" <span class=\"edited\">sha256:{digest}</span>" if digest else ""
+    if name.lower().endswith(IMAGE_EXTENSIONS):
+        return f"<div class=\"attachment\"><a href=\"{_text(link)}\"><img src=\"{_text(link)}\" alt=\"{_text(name)}\"></a>{archived}</div>"
+    return f"<div class=\"attachment\">📎 <a href=\"{_text(link)}\">{_text(name)}</a>{archived}</div>"
+
+
+def render_message(record: dict, reply_authors: dict, archive_base_url: str | None = None) -> str:
+    """Rendu d'un message capturé."""
+    classes = ["msg"]
+    if record.get("is_staff"):
+        classes.append("staff")
+    if record.get("deleted"):
+        classes.append("deleted")
+
+    parts = [f"<div class=\"{' '.join(classes)}\" id=\"msg-{record['message_id']}\">"]
+
+    reply_to = record.get("reply_to")
+    if reply_to:
+        reply_author = reply_authors.get(reply_to, "message inconnu")
+        parts.append(f"<div class=\"reply\">↪ En réponse à <a href=\"#msg-{reply_to}\">{_text(reply_author)}</a></div>")
+
+    timestamp = record["created_at"].strftime('%d/%m/%Y %H:%M')
+    badge = "<span class=\"badge\">STAFF</span>" if record.get("is_staff") else ""
+    status = ""
+    if record.get("deleted"):
+        status += " <span class=\"edited\">(supprimé)</span>"
+    if record.get("edited_at"):
+        status += " <span class=\"edited\">(modifié)</span>"
+    parts.append(f"<div class=\"meta\"><span class=\"author\">{_text(record['author_name'])}</span>{badge}{timestamp}{status}</div>")
+
+    if record.get("content"):
+        parts.append(f"<div class=\"content\">{_text(record['content'])}</div>")
+    if record.get("edited_at") and record.get("original_content") is not None:
+        parts.append(f"<div class=\"original\">Original : {_text(record['original_content'])}</div>")
+
+    for embed in record.get("embeds") or []:
+        parts.append(render_embed(embed))
+    hashes = record.get("attachment_hashes") or []
+    for i, url in enumerate(record.get("attachments") or []):
+        digest = hashes[i] if i < len(hashes) else None
+        parts.append(render_attachment(url, digest, archive_base_url))
+
+    parts.append("</div>\n")
+    return "".join(parts)
+
+
+def render_messages(records: list, reply_authors: dict, archive_base_url: str | None = None) -> str:
+    """Rendu d'un lot de messages (appelé dans le pool de processus)."""
+    return "".join(render_message(record, reply_authors, archive_base_url) for record in records)